@@ -0,0 +1,212 @@
+"""
+Armazenamento em disco dos resultados das simulações.
+
+CheckpointLog é um arquivo append-only: cada bloco concluído da grade de
+simulação é gravado (e sincronizado) assim que termina, de modo que uma
+execução interrompida retoma do último bloco completo e nada precisa ficar
+acumulado em memória enquanto a grade roda.
+
+ResultadosColunares guarda o resultado final como um array tipado por
+métrica, com eixos (estratégia, k, execução), num diretório de .npy aberto
+por memory-map; gráficos e boxplots leem fatias sem desserializar nada.
+Cada (estratégia, k) guarda quantas execuções tem: com parada antecipada
+os k de baixa variância ficam com menos execuções que os demais.
+"""
+import os
+import pickle
+
+import numpy as np
+
+from cache import load_arrays, save_arrays
+
+FORMAT_VERSION = 3
+
+
+class CheckpointLog:
+
+    def __init__(self, path):
+        self.path = path
+        # um registro truncado no fim (queda no meio da escrita) é descartado
+        if os.path.exists(path):
+            end = self._valid_end()
+            if end < os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+
+    def _records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    key, payload = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, ValueError, TypeError):
+                    return
+                yield f.tell(), key, payload
+
+    def _valid_end(self):
+        end = 0
+        for end, _, _ in self._records():
+            pass
+        return end
+
+    def __iter__(self):
+        for _, key, payload in self._records():
+            yield key, payload
+
+    def keys(self):
+        return {key for key, _ in self}
+
+    def get(self, key, default=None):
+        for k, payload in self:
+            if k == key:
+                return payload
+        return default
+
+    def append(self, key, payload):
+        with open(self.path, "ab") as f:
+            pickle.dump((key, payload), f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ResultadosColunares:
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self._index = {label: i for i, label in enumerate(meta["strategies"])}
+
+    @classmethod
+    def vazio(cls, strategies, runs, ks, seed=None, edge_ks=None, edge_strategies=(), n=None, m=None):
+        """
+        strategies: rótulos; runs: nº de execuções de cada estratégia. As
+        estratégias em edge_strategies removem arestas: o ponto j da grade
+        corresponde a edge_ks[j] arestas em vez de ks[j] vértices. n e m são
+        os totais de vértices e arestas do grafo (a grade pode não ser uniforme).
+        """
+        arrays = {
+            "ks": np.asarray(ks, dtype=np.int64),
+            "edge_ks": np.asarray(ks if edge_ks is None else edge_ks, dtype=np.int64),
+            "n_runs": np.asarray(runs, dtype=np.int64),
+            "k_runs": np.zeros((len(strategies), len(ks)), dtype=np.int64),
+        }
+        meta = {"version": FORMAT_VERSION, "strategies": list(strategies), "metrics": [], "seed": seed,
+                "edge_strategies": list(edge_strategies), "n": n, "m": m}
+        return cls(arrays, meta)
+
+    @property
+    def strategies(self):
+        return self.meta["strategies"]
+
+    @property
+    def metrics(self):
+        return self.meta["metrics"]
+
+    @property
+    def ks(self):
+        return self.arrays["ks"]
+
+    @property
+    def seed(self):
+        return self.meta["seed"]
+
+    def removidos(self, strategy):
+        """Quantidade removida (vértices ou arestas) em cada ponto da grade."""
+        if strategy in self.meta.get("edge_strategies", ()):
+            return self.arrays["edge_ks"]
+        return self.ks
+
+    def pesos_k(self):
+        """
+        Peso de cada ponto da grade: largura da faixa de k que ele representa
+        (metade do caminho até os vizinhos). Numa grade uniforme são todos iguais.
+        """
+        ks = self.ks.astype(float)
+        if len(ks) < 2:
+            return np.ones(len(ks))
+        bordas = np.concatenate(([1.5 * ks[0] - 0.5 * ks[1]], (ks[1:] + ks[:-1]) / 2,
+                                 [1.5 * ks[-1] - 0.5 * ks[-2]]))
+        return np.diff(bordas)
+
+    def pesos(self, strategy):
+        """Peso de cada valor de amostras(): o peso do k dividido pelas suas execuções."""
+        por_k = self.pesos_k() / np.maximum(self.execucoes_k(strategy), 1)
+        return np.broadcast_to(por_k[:, None], self.validas(strategy).shape)[self.validas(strategy)]
+
+    def runs(self, strategy):
+        return int(self.arrays["n_runs"][self._index[strategy]])
+
+    # Escrita
+
+    def gravar(self, strategy, k_index, run, metrics):
+        s = self._index[strategy]
+        for metric, value in metrics.items():
+            if metric not in self.arrays:
+                # a coluna nasce com o tipo do primeiro valor (contagens int64, médias float64)
+                shape = (len(self.strategies), len(self.ks), int(self.arrays["n_runs"].max()))
+                self.arrays[metric] = np.zeros(shape, dtype=np.asarray(value).dtype)
+                self.meta["metrics"].append(metric)
+            self.arrays[metric][s, k_index, run] = value
+        self.arrays["k_runs"][s, k_index] = max(self.arrays["k_runs"][s, k_index], run + 1)
+
+    # Leitura
+
+    def valores(self, metric, strategy):
+        """Fatia (k, execução) de uma métrica; execuções além de execucoes_k ficam zeradas."""
+        s = self._index[strategy]
+        return self.arrays[metric][s, :, :self.arrays["n_runs"][s]]
+
+    def execucoes_k(self, strategy):
+        """Quantas execuções cada ponto da grade tem."""
+        s = self._index[strategy]
+        if "k_runs" not in self.arrays:
+            return np.full(len(self.ks), self.arrays["n_runs"][s])
+        return self.arrays["k_runs"][s]
+
+    def validas(self, strategy):
+        """Máscara (k, execução) das posições preenchidas."""
+        return np.arange(self.runs(strategy)) < self.execucoes_k(strategy)[:, None]
+
+    def amostras(self, metric, strategy):
+        """Todos os valores registrados de uma métrica, em qualquer k."""
+        return self.valores(metric, strategy)[self.validas(strategy)]
+
+    def media(self, metric, strategy):
+        values = np.where(self.validas(strategy), self.valores(metric, strategy), 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return values.sum(axis=1) / self.execucoes_k(strategy)
+
+    # Malha contraída
+
+    def projetar_contracao(self, keep, n_original, ordens):
+        """
+        Resultados de uma malha contraída: keep[i] é o vértice do grafo
+        completo que o vértice i representa e ordens leva cada estratégia de
+        ranking à sua ordem de remoção, guardada já nos índices do grafo completo.
+        """
+        self.arrays["keep"] = np.asarray(keep, dtype=np.int64)
+        for strategy, ordem in ordens.items():
+            self.arrays["ordem_" + strategy] = self.arrays["keep"][np.asarray(ordem, dtype=np.int64)]
+        self.meta["n_original"] = int(n_original)
+
+    def ordem_original(self, strategy):
+        """Ordem de remoção de um ranking nos índices do grafo completo."""
+        return self.arrays["ordem_" + strategy]
+
+    def removidos_originais(self, strategy, k_index):
+        """Vértices do grafo completo removidos no ponto k_index da grade."""
+        return self.ordem_original(strategy)[:self.ks[k_index]]
+
+    # Persistência
+
+    def salvar(self, path):
+        save_arrays(path, self.arrays, self.meta)
+
+    @classmethod
+    def abrir(cls, path):
+        return cls(*load_arrays(path))
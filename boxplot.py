@@ -1,59 +1,57 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import pickle
-import os
+import numpy as np
 from matplotlib.ticker import FuncFormatter
+from cache import latest
+from armazenamento import ResultadosColunares
 
 
-CACHE_DIR = "dados_cache"
-results_path = os.path.join(CACHE_DIR, "resultados.pkl")
+# resultados mais recentes registrados no cache por centralidades_ataques.py
+results_path = latest("resultados")
 
-if not os.path.exists(results_path):
-    raise FileNotFoundError(f"Arquivo {results_path} não encontrado!")
+if results_path is None:
+    raise FileNotFoundError("Nenhum resultado encontrado em dados_cache! Rode centralidades_ataques.py antes.")
 
 
-# Carregar resultados
+# Carregar resultados (memory-map: só as fatias usadas são lidas do disco)
 print("Carregando resultados...")
-with open(results_path, "rb") as f:
-    data = pickle.load(f)
-
-ks = sorted(data["simulations"].keys())
-deterministic_labels = ["Degree", "Closeness", "Betweenness"]
-random_label = ["Random10","Random20","Random100"]
-
-
-# extrair dados para boxplot
-def extract_boxplot_data(metric):
-    rows = []
-
-    for k in ks:
-
-        # determinísticos — 1 valor por k
-        for label in deterministic_labels:
-            rows.append({
-                "strategy": label,
-                "value": data["simulations"][k][label.lower()][metric]
-            })
-
-        # random10
-        for res in data["simulations"][k]["random_10"]:
-            rows.append({"strategy": "Random10", "value": res[metric]})
-
-        # random20
-        for res in data["simulations"][k]["random_20"]:
-            rows.append({"strategy": "Random20", "value": res[metric]})
-
-        # random100
-        for res in data["simulations"][k]["random_100"]:
-            rows.append({"strategy": "Random100", "value": res[metric]})
-
-    return pd.DataFrame(rows)
-
-
-
-df_components = extract_boxplot_data("n_components")
-df_disconnected = extract_boxplot_data("disconnected_pairs")
-df_largest_cc = extract_boxplot_data("largest_cc_size")
+data = ResultadosColunares.abrir(results_path)
+
+# "random_10" -> "Random10", "random_weak_10" -> "Random10 (weak)", "degree" -> "Degree",
+# "degree_adaptive" -> "Degree adaptive"
+def strategy_name(label):
+    if label.startswith("random_weak_"):
+        return "Random" + label.split("_")[2] + " (weak)"
+    if label.startswith("random_"):
+        return "Random" + label.split("_")[1]
+    return label.replace("_", " ").capitalize()
+
+
+# quantil ponderado: cada valor vale a faixa de k que representa
+def weighted_quantile(values, weights, q):
+    order = np.argsort(values)
+    values, weights = values[order], weights[order]
+    cum = np.cumsum(weights) - weights / 2
+    return np.interp(q * weights.sum(), cum, values)
+
+
+# estatísticas do boxplot (quartis e bigodes de 1,5 IQR) com pesos
+def weighted_stats(values, weights, label):
+    values = np.asarray(values, dtype=float)
+    q1, med, q3 = (weighted_quantile(values, weights, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {"label": label, "med": med, "q1": q1, "q3": q3,
+            "whislo": inside.min(), "whishi": inside.max(),
+            "fliers": values[(values < inside.min()) | (values > inside.max())]}
+
+
+# dados do boxplot: todos os (k, execução) registrados de cada estratégia, pesados
+# pela faixa de k de cada ponto (a grade pode ser mais densa perto do colapso)
+def boxplot_metric(metric, ax):
+    stats = [weighted_stats(data.amostras(metric, label), data.pesos(label), strategy_name(label))
+             for label in data.strategies]
+    ax.bxp(stats)
+    ax.tick_params(axis="x", labelrotation=30)
 
 
 # Plot
@@ -65,14 +63,14 @@ fig.suptitle("Distribuição das Métricas de Robustez sob Diferentes Estratégi
 
 
 # 1. Número de Componentes
-df_components.boxplot(by="strategy", column="value",ax=axes[0,0])
+boxplot_metric("n_components", axes[0,0])
 axes[0,0].set_title("Número de Componentes")
 axes[0,0].set_ylabel("Qtd. de Componentes")         
 axes[0,0].set_xlabel("")
 axes[0,0].grid(True)
 
 # 2. Pares Desconectados
-df_disconnected.boxplot(by="strategy", column="value",ax=axes[0,1])
+boxplot_metric("disconnected_pairs", axes[0,1])
 axes[0,1].set_title("Pares Desconectados")
 axes[0,1].set_ylabel("Qtd. de Pares Desconectados")         
 axes[0,1].set_xlabel("")
@@ -81,7 +79,7 @@ axes[0,1].grid(True)
 axes[0,1].yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'{int(x):,}'))
 
 # 3. Maior Componente Conectado
-df_largest_cc.boxplot(by="strategy", column="value",ax=axes[1,0])
+boxplot_metric("largest_cc_size", axes[1,0])
 axes[1,0].set_title("Tamanho da Maior Componente Conectada")
 axes[1,0].set_ylabel("Proporção de Nós no Maior CC")            
 axes[1,0].set_xlabel("")
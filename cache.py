@@ -0,0 +1,174 @@
+"""
+Cache de artefatos endereçado por conteúdo, compartilhado pelos scripts.
+
+Cada artefato (grafo, centralidades, resultados, partições...) fica em
+dados_cache/<etapa>-<hash><ext>, onde o hash cobre os parâmetros da etapa e
+as chaves dos artefatos de que ela depende. Mudar um parâmetro gera chaves
+novas só para a etapa afetada e para as que dependem dela; o resto é
+reaproveitado. O manifesto registra dependências, tamanho e último uso, e
+os artefatos usados há mais tempo saem quando o cache passa do limite.
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+
+CACHE_DIR = "dados_cache"
+MANIFEST_PATH = os.path.join(CACHE_DIR, "manifesto.json")
+MAX_CACHE_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 20 * 1024 ** 3))
+
+
+def save_pickle(obj, filename):
+    with open(filename, "wb") as f:
+        pickle.dump(obj, f)
+
+def load_pickle(filename):
+    with open(filename, "rb") as f:
+        return pickle.load(f)
+
+def save_arrays(path, arrays, meta):
+    # diretório com um .npy por array e os metadados em meta.json
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), array)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+def load_arrays(path):
+    # (arrays, meta) de save_arrays; os arrays são abertos por memory-map
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {
+        name[:-4]: np.load(os.path.join(path, name), mmap_mode="r")
+        for name in os.listdir(path) if name.endswith(".npy")
+    }
+    return arrays, meta
+
+
+# Manifesto
+
+def _load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_manifest(manifest):
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, MANIFEST_PATH)
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def _remove(manifest, key):
+    entry = manifest.pop(key)
+    path = os.path.join(CACHE_DIR, entry["file"])
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+# Chaves
+
+def artifact_key(stage, params=None, deps=()):
+    payload = json.dumps({"params": params, "deps": list(deps)}, sort_keys=True, default=str)
+    return f"{stage}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]}"
+
+def file_key(path):
+    # hash do conteúdo de um arquivo de entrada que não veio do cache
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+def artifact_path(key, ext=".pkl"):
+    return os.path.join(CACHE_DIR, key + ext)
+
+
+# Acesso
+
+def cached(stage, params, deps, compute, ext=".pkl", save=save_pickle, load=load_pickle, label=None):
+    """
+    Devolve (artefato, chave). Se a chave da etapa já está no cache o artefato
+    é carregado; senão compute() é chamado e o resultado salvo e registrado.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    label = label or stage
+    key = artifact_key(stage, params, deps)
+    path = artifact_path(key, ext)
+
+    manifest = _load_manifest()
+    if key in manifest and os.path.exists(path):
+        print(f"🔹 Carregando {label} do cache ({key})...")
+        manifest[key]["last_used"] = time.time()
+        _save_manifest(manifest)
+        return load(path), key
+
+    print(f"Calculando {label} ({key})...")
+    obj = compute()
+    save(obj, path)
+
+    now = time.time()
+    manifest = _load_manifest()
+    manifest[key] = {
+        "stage": stage,
+        "file": os.path.basename(path),
+        "deps": list(deps),
+        "params": json.loads(json.dumps(params, default=str)),
+        "size": _size(path),
+        "created": now,
+        "last_used": now,
+    }
+    evict(manifest, keep={key, *deps})
+    _save_manifest(manifest)
+    print(f"✅ Salvo em cache: {label}.")
+    return obj, key
+
+def latest(stage):
+    """Caminho do artefato da etapa usado mais recentemente, ou None."""
+    entries = [e for e in _load_manifest().values() if e["stage"] == stage]
+    entries = [e for e in entries if os.path.exists(os.path.join(CACHE_DIR, e["file"]))]
+    if not entries:
+        return None
+    return os.path.join(CACHE_DIR, max(entries, key=lambda e: e["last_used"])["file"])
+
+
+# Invalidação e despejo
+
+def invalidate(key):
+    """Remove o artefato e, transitivamente, todos os que dependem dele."""
+    manifest = _load_manifest()
+    doomed = {key}
+    changed = True
+    while changed:
+        changed = False
+        for k, entry in manifest.items():
+            if k not in doomed and doomed.intersection(entry["deps"]):
+                doomed.add(k)
+                changed = True
+    for k in doomed & manifest.keys():
+        _remove(manifest, k)
+    _save_manifest(manifest)
+
+def evict(manifest, keep=(), max_bytes=None):
+    # LRU: remove os artefatos usados há mais tempo até caber no limite
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    total = sum(e["size"] for e in manifest.values())
+    for key in sorted(manifest, key=lambda k: manifest[k]["last_used"]):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        total -= manifest[key]["size"]
+        _remove(manifest, key)
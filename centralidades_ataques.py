@@ -1,26 +1,25 @@
 import os
-import pickle
+import math
 import random
+from statistics import NormalDist
 import igraph as ig
-from tqdm import tqdm
-import osmnx as ox
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+from scipy.sparse.csgraph import breadth_first_order, connected_components, dijkstra
+from scipy.spatial import cKDTree
+import shapely
 from shapely.geometry import Polygon
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
+from cache import CACHE_DIR, artifact_key, artifact_path, cached
+from grafo import carregar_contraido, carregar_grafo
+from armazenamento import FORMAT_VERSION, CheckpointLog, ResultadosColunares
+from conexoTcc import strong_bridge_impact, strong_connectivity
+from paralelo import carga_grafo, mapa_paralelo
 
-CACHE_DIR = "dados_cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 
-def save_pickle(obj, filename):
-    with open(filename, "wb") as f:
-        pickle.dump(obj, f)
-
-def load_pickle(filename):
-    with open(filename, "rb") as f:
-        return pickle.load(f)
-    
-
 # Polígono de Palmas
 
 coords = [
@@ -49,187 +48,1542 @@ custom_filter = (
 
 
 
-# Converter NetworkX p iGraph
+# Centralidades
+
+BASE_CENTRALITIES = ("degree", "closeness", "betweenness")
+EXTRA_CENTRALITIES = ("harmonic", "pagerank", "coreness", "weighted_betweenness")
 
-def nx_to_igraph(G_nx, directed=True):
-    mapping = {node: idx for idx, node in enumerate(G_nx.nodes())}
-    G_ig = ig.Graph(directed=directed)
-    G_ig.add_vertices(len(mapping))
+class CentralityTable:
+    """
+    Centralidades dos vértices: uma coluna NumPy por medida (posição = índice
+    do vértice) e o ranking decrescente de cada uma, calculado uma vez com
+    argsort estável (empates na ordem dos índices, como sort_ranking).
+    """
+    VERSION = 1
 
-    for node, idx in mapping.items():
-        n = G_nx.nodes[node]
-        G_ig.vs[idx]["id"] = node
-        G_ig.vs[idx]["x"] = n.get("x", None)
-        G_ig.vs[idx]["y"] = n.get("y", None)
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        self.rankings = {name: np.argsort(-values, kind="stable") for name, values in self.columns.items()}
 
-    edges = []
-    weights = []
-    for u, v, data in G_nx.edges(data=True):
-        edges.append((mapping[u], mapping[v]))
-        weights.append(data.get("length", 1.0))
-    G_ig.add_edges(edges)
-    G_ig.es["weight"] = weights
+    def __getitem__(self, measure):
+        return self.columns[measure]
 
-    return G_ig, mapping
+    def __contains__(self, measure):
+        return measure in self.columns
 
+    @property
+    def measures(self):
+        return list(self.columns)
 
-# Centralidades
+    def ranking(self, measure):
+        return self.rankings[measure]
+
+def compute_centrality(G, measure):
+    # uma medida por chamada: cada uma vira uma tarefa do pool de processos
+    if measure == "degree":
+        return G.degree()
+    if measure == "closeness":
+        return G.closeness(mode="ALL")
+    if measure == "betweenness":
+        return G.betweenness()
+    if measure == "harmonic":
+        return G.harmonic_centrality(mode="ALL")
+    if measure == "pagerank":
+        return G.pagerank(directed=True)
+    if measure == "coreness":
+        return G.coreness(mode="ALL")
+    if measure == "weighted_betweenness":
+        return G.betweenness(weights="weight")
+    raise ValueError(f"Centralidade desconhecida: {measure}")
+
+def compute_centralities_igraph(G, measures=BASE_CENTRALITIES, n_workers=1):
+    """Tabela de centralidades exatas; as medidas são calculadas em paralelo, uma por tarefa."""
+    columns = run_tasks(G, [("centrality", measure) for measure in measures], n_workers, desc="Centralidades")
+    return CentralityTable(dict(zip(measures, columns)))
+
+def pivot_contributions(G, sources, weights=None):
+    # contribuição de um bloco de fontes (pivôs) para betweenness e closeness
+    betweenness = np.asarray(G.betweenness(sources=sources, weights=weights), dtype=float)
+    dist = np.asarray(G.distances(source=sources, mode="ALL", weights=weights), dtype=float)
+    dist[np.arange(len(sources)), sources] = np.inf
+    reached = np.isfinite(dist)
+    dist_sum = np.where(reached, dist, 0.0).sum(axis=0)
+    return betweenness, dist_sum, reached.sum(axis=0)
+
+def compute_centralities_approx(G, n_samples=None, epsilon=0.05, delta=0.1,
+                                n_workers=1, seed=None, measures=BASE_CENTRALITIES):
+    """
+    Betweenness e closeness estimadas a partir de uma amostra de pivôs
+    (Brandes-Pich / Eppstein-Wang), em saltos como as exatas; se pedida,
+    weighted_betweenness sai dos mesmos pivôs, ponderada pelo comprimento.
+    O número de pivôs é n_samples ou sai do limite epsilon/delta; os blocos
+    de pivôs rodam em paralelo. As demais medidas pedidas em measures são
+    exatas. Devolve uma CentralityTable, como compute_centralities_igraph.
+    """
+    n = G.vcount()
+    samples = min(n, n_samples or betweenness_sample_size(n, epsilon, delta))
+    pivots = random.Random(seed).sample(range(n), samples)
+
+    n_chunks = max(1, min(samples, 4 * (n_workers or os.cpu_count())))
+    chunks = [pivots[i::n_chunks] for i in range(n_chunks)]
+    partials = run_tasks(G, [("pivots", chunk, None) for chunk in chunks], n_workers, desc="Pivôs")
+
+    betweenness = sum(p[0] for p in partials) * (n / samples)
+    dist_sum = sum(p[1] for p in partials)
+    reached = sum(p[2] for p in partials)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        closeness = np.where(reached > 0, reached / dist_sum, np.nan)
 
-def compute_centralities_igraph(G):
-    degree = G.degree()
-    closeness = G.closeness(mode="ALL")
-    betweenness = G.betweenness()
+    columns = {"degree": G.degree(), "closeness": closeness, "betweenness": betweenness}
+    if "weighted_betweenness" in measures:
+        weighted = run_tasks(G, [("pivots", chunk, "weight") for chunk in chunks], n_workers, desc="Pivôs")
+        columns["weighted_betweenness"] = sum(p[0] for p in weighted) * (n / samples)
+    others = [measure for measure in measures if measure not in columns]
+    if others:
+        exact = run_tasks(G, [("centrality", measure) for measure in others], n_workers, desc="Centralidades")
+        columns.update(zip(others, exact))
+    return CentralityTable({measure: columns[measure] for measure in measures})
+
+def compute_edge_centralities(G):
+    """
+    Rankings de arestas: edge betweenness e pontes fortes ordenadas pelo
+    número de pares que perdem alcançabilidade mútua (análise do conexoTcc).
+    """
+    conectividade = strong_connectivity(G)
+    impacto = strong_bridge_impact(G, conectividade)
+    order = np.argsort(-impacto["lost_pairs"], kind="stable")
     return {
-        "degree": {v.index: degree[v.index] for v in G.vs},
-        "closeness": {v.index: closeness[v.index] for v in G.vs},
-        "betweenness": {v.index: betweenness[v.index] for v in G.vs},
+        "edge_betweenness": dict(enumerate(G.edge_betweenness())),
+        "strong_bridges": impacto["bridges"][order].tolist(),
     }
 
+def strong_bridges_ranking(bridges, edge_betweenness):
+    # pontes fortes primeiro (maior impacto antes); depois as demais por edge betweenness
+    first = set(bridges)
+    return list(bridges) + [e for e in sort_ranking(edge_betweenness) if e not in first]
+
 def sort_ranking(centrality_dict):
     return sorted(centrality_dict.keys(), key=lambda k: centrality_dict[k], reverse=True)
 
 
-# Remoção de nós
+# Remoção por máscara: adjacência CSR imutável + vetor de vértices vivos
+
+def igraph_to_csr(G):
+    n = G.vcount()
+    edges = np.array(G.get_edgelist(), dtype=np.int32).reshape(-1, 2)
+    data = np.ones(len(edges), dtype=np.int8)
+    return csr_matrix((data, (edges[:, 0], edges[:, 1])), shape=(n, n))
 
-def remove_nodes_by_centrality_fixed_ranking(G_original, k, ranking):
-    G = G_original.copy()
+def alive_mask_random(n, k, rng=random):
+    alive = np.ones(n, dtype=bool)
     if k > 0:
-        G.delete_vertices(ranking[:k])
-    return G
+        alive[rng.sample(range(n), k)] = False
+    return alive
+
+def edge_csr(G):
+    """
+    CSR com uma entrada por aresta (multiarestas não são somadas) e a
+    permutação perm: a posição i da CSR é a aresta perm[i] do igraph.
+    """
+    n = G.vcount()
+    edges = np.array(G.get_edgelist(), dtype=np.int32).reshape(-1, 2)
+    perm = np.argsort(edges[:, 0], kind="stable")
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(edges[:, 0], minlength=n))))
+    A = csr_matrix((np.ones(len(edges), dtype=np.int8), edges[perm, 1], indptr), shape=(n, n))
+    return A, perm
 
-def remove_nodes_random(G_original, k):
-    G = G_original.copy()
+def alive_edge_mask_random(m, k, rng=random, weights=None):
+    alive = np.ones(m, dtype=bool)
     if k > 0:
-        G.delete_vertices(random.sample(range(G.vcount()), k))
-    return G
+        alive[random_edge_order(m, rng, weights)[:k]] = False
+    return alive
+
+def masked_csr(A, perm, alive=None, alive_edges=None):
+    # CSR sem as arestas removidas nem as que tocam vértices removidos, sem
+    # reconstruir o grafo; perm (de edge_csr) só é usada com alive_edges
+    keep = np.ones(A.nnz, dtype=bool)
+    if alive is not None:
+        keep &= np.repeat(alive, np.diff(A.indptr)) & alive[A.indices]
+    if alive_edges is not None:
+        keep &= alive_edges[perm]
+    indptr = np.concatenate(([0], np.cumsum(keep)))[A.indptr]
+    return csr_matrix((A.data[keep], A.indices[keep], indptr), shape=A.shape)
+
+def strong_components_edge_masked(A, perm, alive_edges):
+    _, labels = connected_components(masked_csr(A, perm, alive_edges=alive_edges),
+                                     directed=True, connection="strong")
+    return labels
+
+def strong_components_masked(A, alive, perm=None, alive_edges=None):
+    # os mortos viram vértices isolados e são ignorados pelo chamador
+    _, labels = connected_components(masked_csr(A, perm, alive, alive_edges), directed=True, connection="strong")
+    return np.where(alive, labels, -1)
 
 
 # Métricas de conectividade
 
-def compute_connectivity_metrics(G):
-    if G.vcount() == 0:
-        return {"n_components": 0, "largest_cc_size": 0, "disconnected_pairs": 0}
+def metrics_from_membership(membership):
+    """
+    Métricas a partir do vetor de pertencimento (componente de cada vértice,
+    -1 para vértices removidos). Um vetor 1-D devolve um dict de inteiros;
+    uma matriz 2-D, com uma amostra por linha, devolve um dict de arrays.
+    """
+    membership = np.asarray(membership, dtype=np.int64)
+    batch = np.atleast_2d(membership)
+    rows = batch.shape[0]
+
+    alive = batch >= 0
+    n_alive = alive.sum(axis=1)
+    width = int(batch.max()) + 1 if batch.size else 0
+    width = max(width, 1)
+    offsets = (batch + np.arange(rows)[:, None] * width)[alive]
+    sizes = np.bincount(offsets, minlength=rows * width).reshape(rows, width)
+
+    metrics = {
+        "n_components": (sizes > 0).sum(axis=1),
+        "largest_cc_size": sizes.max(axis=1),
+        "disconnected_pairs": (n_alive * n_alive - (sizes * sizes).sum(axis=1)) // 2
+    }
+    if membership.ndim == 1:
+        return {name: int(values[0]) for name, values in metrics.items()}
+    return metrics
+
+def unbatch_metrics(metrics):
+    names = list(metrics)
+    return [dict(zip(names, map(int, row))) for row in zip(*metrics.values())]
+
+def compute_connectivity_metrics_batch(A, alive_masks, perm=None, alive_edge_masks=None):
+    # com alive_edge_masks (e a perm de edge_csr), cada máscara de vértices vem com a sua de arestas
+    edge_masks = [None] * len(alive_masks) if alive_edge_masks is None else alive_edge_masks
+    membership = np.stack([strong_components_masked(A, alive, perm, alive_edges)
+                           for alive, alive_edges in zip(alive_masks, edge_masks)])
+    return metrics_from_membership(membership)
+
+def compute_connectivity_metrics_edge_batch(A, perm, alive_edge_masks):
+    membership = np.stack([strong_components_edge_masked(A, perm, alive) for alive in alive_edge_masks])
+    return metrics_from_membership(membership)
+
+def compute_connectivity_metrics(G, alive=None):
+    if issparse(G):
+        alive = np.ones(G.shape[0], dtype=bool) if alive is None else alive
+        return metrics_from_membership(strong_components_masked(G, alive))
+
+    return metrics_from_membership(G.connected_components(mode="STRONG").membership)
+
+
+# Componentes fortemente conexas incrementais
+
+class IncrementalSCC:
+    """
+    Mantém as componentes fortemente conexas de um grafo dirigido enquanto
+    vértices e arestas são inseridos. As componentes ficam num union-find e
+    o DAG de condensação numa ordem topológica dinâmica (Pearce-Kelly): cada
+    inserção só percorre a janela da ordem afetada e contrai os ciclos criados.
+    """
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+        self.alive = [False] * n
+        self.ord = [0.0] * n
+        self.out = [[] for _ in range(n)]
+        self.inn = [[] for _ in range(n)]
+        self.used = set()
+        self.lo = 0.0
+        self.hi = 0.0
+        self.n_alive = 0
+        self.n_components = 0
+        self.sum_sq = 0
+        self.largest = 0
+
+    def find(self, v):
+        parent = self.parent
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def metrics(self):
+        return {
+            "n_components": self.n_components,
+            "largest_cc_size": self.largest,
+            "disconnected_pairs": (self.n_alive * self.n_alive - self.sum_sq) // 2
+        }
+
+    def add_vertex(self, v, successors, predecessors):
+        alive = self.alive
+        succ = [w for w in successors if alive[w] and w != v]
+        pred = [u for u in predecessors if alive[u] and u != v]
+
+        alive[v] = True
+        self.n_alive += 1
+        self.n_components += 1
+        self.sum_sq += 1
+        self.largest = max(self.largest, 1)
+
+        self._insert({self.find(u) for u in pred}, {self.find(w) for w in succ}, v)
+
+        r = self.find(v)
+        self.out[r].extend(succ)
+        self.inn[r].extend(pred)
+        for w in succ:
+            self.inn[self.find(w)].append(v)
+        for u in pred:
+            self.out[self.find(u)].append(v)
+
+    def add_edge(self, u, w):
+        cu, cw = self.find(u), self.find(w)
+        if cu != cw and self.ord[cu] > self.ord[cw]:
+            self._insert({cu}, {cw})
+        self.out[self.find(u)].append(w)
+        self.inn[self.find(w)].append(u)
+
+    def _insert(self, preds, succs, new=None):
+        # preds -> (new) -> succs; sem violação da ordem basta posicionar o novo vértice
+        ordv = self.ord
+        last_pred = max(preds, key=ordv.__getitem__) if preds else None
+        first_succ = min(succs, key=ordv.__getitem__) if succs else None
+        if last_pred is None or first_succ is None or ordv[last_pred] < ordv[first_succ]:
+            if new is not None:
+                self._place(new, last_pred, first_succ)
+            return
+
+        ub, lb = ordv[last_pred], ordv[first_succ]
+        forward = self._search(self.out, succs, lambda c: ordv[c] <= ub)
+        backward = self._search(self.inn, preds, lambda c: ordv[c] >= lb)
+        cycle = forward & backward
+
+        delta_b = sorted(backward - cycle, key=ordv.__getitem__)
+        delta_f = sorted(forward - cycle, key=ordv.__getitem__)
+        pool = sorted(ordv[c] for c in forward | backward)
+        for c, slot in zip(delta_b, pool):
+            ordv[c] = slot
+        for c, slot in zip(delta_f, pool[len(pool) - len(delta_f):]):
+            ordv[c] = slot
+
+        if cycle:
+            for slot in pool[len(delta_b) + 1:len(pool) - len(delta_f)]:
+                self.used.discard(slot)
+            members = list(cycle) + ([new] if new is not None else [])
+            ordv[self._union(members)] = pool[len(delta_b)]
+        elif new is not None:
+            self._place(new, max(preds, key=ordv.__getitem__), min(succs, key=ordv.__getitem__))
+
+    def _search(self, adj, start, inside):
+        seen = {c for c in start if inside(c)}
+        stack = list(seen)
+        while stack:
+            c = stack.pop()
+            reps = {self.find(t) for t in adj[c]}
+            reps.discard(c)
+            adj[c] = list(reps)
+            for r in reps:
+                if r not in seen and inside(r):
+                    seen.add(r)
+                    stack.append(r)
+        return seen
+
+    def _place(self, v, lo, hi):
+        if hi is None:
+            x = self.hi + 1
+        elif lo is None:
+            x = self.lo - 1
+        else:
+            x = self._between(lo, hi)
+        self.ord[v] = x
+        self.used.add(x)
+        self.lo = min(self.lo, x)
+        self.hi = max(self.hi, x)
+
+    def _between(self, a, b):
+        while True:
+            lo, hi = self.ord[a], self.ord[b]
+            x = (lo + hi) / 2
+            while lo < x < hi and x in self.used:
+                hi = x
+                x = (lo + hi) / 2
+            if lo < x < hi:
+                return x
+            self._renumber()
+
+    def _renumber(self):
+        # precisão de ponto flutuante esgotada entre dois vizinhos: reespaça a ordem inteira
+        reps = [v for v in range(len(self.parent)) if self.alive[v] and self.parent[v] == v]
+        reps.sort(key=self.ord.__getitem__)
+        for i, r in enumerate(reps):
+            self.ord[r] = float(i << 20)
+        self.used = {self.ord[r] for r in reps}
+        self.lo = 0.0
+        self.hi = float(max(len(reps) - 1, 0) << 20)
 
-    comps = G.connected_components(mode="STRONG")
-    if len(comps) == 0:
-        return {"n_components": 0, "largest_cc_size": 0, "disconnected_pairs": 0}
+    def _union(self, members):
+        members = [self.find(c) for c in members]
+        root = max(members, key=self.size.__getitem__)
+        for c in members:
+            if c == root:
+                continue
+            self.sum_sq -= self.size[c] ** 2 + self.size[root] ** 2
+            self.parent[c] = root
+            self.size[root] += self.size[c]
+            self.sum_sq += self.size[root] ** 2
+            self.n_components -= 1
+            for adj in (self.out, self.inn):
+                if len(adj[c]) > len(adj[root]):
+                    adj[c], adj[root] = adj[root], adj[c]
+                adj[root].extend(adj[c])
+                adj[c] = []
+        self.largest = max(self.largest, self.size[root])
+        return root
 
-    num_components = len(comps)
-    largest_cc = max(comps, key=len)
-    largest_cc_size = len(largest_cc)
+
+# Métricas ponderadas por caminhos mínimos (amostra de fontes)
+
+def weighted_edge_csr(G, weights="weight"):
+    # CSR de edge_csr com o comprimento de cada aresta; multiarestas ficam como paralelas
+    A, perm = edge_csr(G)
+    w = G.es[weights] if weights in G.es.attributes() else np.ones(G.ecount())
+    return csr_matrix((np.asarray(w, dtype=float)[perm], A.indices, A.indptr), shape=A.shape), perm
+
+class MaskedMetrics:
+    # métricas avaliadas sobre o grafo mascarado, acopláveis às curvas de ataque
+
+    def add_to_curve(self, curve, order, edges=False):
+        # métricas para cada k de uma curva cuja remoção é order[:k]
+        size = len(self.perm) if edges else self.A.shape[0]
+        for k, metrics in curve.items():
+            mask = np.ones(size, dtype=bool)
+            mask[list(order[:k])] = False
+            metrics.update(self.metrics(alive_edges=mask) if edges else self.metrics(alive=mask))
+        return curve
+
+class PathSampler(MaskedMetrics):
+    """
+    Eficiência global e inflação dos caminhos mínimos (comprimento das vias)
+    estimadas por Dijkstra a partir de uma amostra fixa de fontes. As mesmas
+    fontes e as distâncias do grafo intacto são reaproveitadas em todos os k,
+    então as curvas são comparáveis; cada fonte viva é uma observação e o
+    intervalo de confiança sai do desvio padrão entre fontes.
+    """
+
+    def __init__(self, G, sources, confidence=0.95, chunk=32):
+        self.A, self.perm = weighted_edge_csr(G)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.chunk = chunk
+        self.base = self._distances(self.A, self.sources)
+
+    def _distances(self, A, sources):
+        # Dijkstra multi-fonte em blocos, para limitar a memória (fontes x n)
+        if not len(sources):
+            return np.empty((0, A.shape[0]))
+        return np.vstack([dijkstra(A, directed=True, indices=sources[i:i + self.chunk])
+                          for i in range(0, len(sources), self.chunk)])
+
+    def _summary(self, values):
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return float("nan"), float("nan")
+        half = self.z * values.std(ddof=1) / math.sqrt(len(values)) if len(values) > 1 else float("nan")
+        return float(values.mean()), float(half)
+
+    def metrics(self, alive=None, alive_edges=None):
+        """Métricas com os vértices (alive) ou arestas (alive_edges) removidos mascarados."""
+        n = self.A.shape[0]
+        alive = np.ones(n, dtype=bool) if alive is None else alive
+        sub = masked_csr(self.A, self.perm, alive, alive_edges)
+
+        active = alive[self.sources]
+        dist = self._distances(sub, self.sources[active])
+        base = self.base[active]
+        dist[:, ~alive] = np.inf
+        dist[np.arange(len(dist)), self.sources[active]] = np.inf
+
+        n_alive = int(alive.sum())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            efficiency = (1.0 / dist).sum(axis=1) / max(n_alive - 1, 1)
+            reachable = np.isfinite(dist) & (base > 0)
+            ratio = np.where(reachable, dist / base, 0.0)
+            inflation = ratio.sum(axis=1) / reachable.sum(axis=1)
+
+        efficiency, efficiency_ci = self._summary(efficiency)
+        inflation, inflation_ci = self._summary(inflation)
+        return {
+            "efficiency": efficiency,
+            "efficiency_ci": efficiency_ci,
+            "path_inflation": inflation,
+            "path_inflation_ci": inflation_ci,
+        }
+
+
+# Alcançabilidade ordenada (DAG de condensação)
+
+def condensation(sub, alive):
+    """
+    Componentes fortemente conexas dos vértices vivos e arestas distintas do
+    DAG de condensação: (rótulo por vértice, -1 nos mortos; tamanhos; origem; destino).
+    """
+    _, labels = connected_components(sub, directed=True, connection="strong")
+    comps, labels_alive = np.unique(labels[alive], return_inverse=True)
+    labels = np.full(len(alive), -1, dtype=np.int64)
+    labels[alive] = labels_alive
+    sizes = np.bincount(labels_alive, minlength=len(comps))
+
+    coo = sub.tocoo()
+    a, b = labels[coo.row], labels[coo.col]
+    cross = a != b
+    dag = np.unique(np.column_stack((a[cross], b[cross])), axis=0) if cross.any() \
+        else np.empty((0, 2), dtype=np.int64)
+    return labels, sizes, dag[:, 0], dag[:, 1]
+
+def reach_sizes(sizes, src, dst, block_rows=2048):
+    """
+    Quantos vértices cada componente alcança (incluindo ela mesma): fecho
+    transitivo com um bitset por componente, preenchido em ordem topológica
+    reversa. Cada rodada trata de uma vez todas as componentes cujos
+    sucessores já estão prontos.
+    """
+    c = len(sizes)
+    words = (c + 63) // 64
+    bits = np.zeros((c, words), dtype="<u8")
+    own = np.arange(c)
+    bits[own, own // 64] = np.left_shift(np.uint64(1), (own % 64).astype(np.uint64))
+
+    order = np.argsort(src, kind="stable")
+    src, dst = src[order], dst[order]
+    out_ptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=c))))
+    by_dst = np.argsort(dst, kind="stable")
+    in_ptr = np.concatenate(([0], np.cumsum(np.bincount(dst, minlength=c))))
+    outdeg = np.diff(out_ptr)
+
+    frontier = np.flatnonzero(outdeg == 0)
+    while len(frontier):
+        # arestas saindo da fronteira: todos os destinos já têm o seu fecho
+        e = np.concatenate([np.arange(out_ptr[v], out_ptr[v + 1]) for v in frontier]) if len(src) else []
+        if len(e):
+            np.bitwise_or.at(bits, src[e], bits[dst[e]])
+        incoming = np.concatenate([by_dst[in_ptr[v]:in_ptr[v + 1]] for v in frontier])
+        preds = src[incoming]
+        np.subtract.at(outdeg, preds, 1)
+        preds = np.unique(preds)
+        frontier = preds[outdeg[preds] == 0]
+
+    # soma dos tamanhos das componentes alcançadas, em blocos de linhas
+    weights = np.zeros(words * 64)
+    weights[:c] = sizes
+    reach = np.empty(c)
+    for i in range(0, c, block_rows):
+        flags = np.unpackbits(bits[i:i + block_rows].view(np.uint8), axis=1, bitorder="little")
+        reach[i:i + block_rows] = flags @ weights
+    return reach
+
+class ReachabilityCounter(MaskedMetrics):
+    """
+    Pares ordenados (x, y) de vértices vivos em que y não é alcançável a
+    partir de x. Exato pelo fecho transitivo do DAG de condensação enquanto
+    ele tem até exact_limit componentes; acima disso, estimado por BFS a
+    partir de uma amostra fixa de fontes (a mesma em todos os k).
+    """
+
+    def __init__(self, G, sources=(), exact_limit=20000):
+        self.A, self.perm = edge_csr(G)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.exact_limit = exact_limit
+
+    def metrics(self, alive=None, alive_edges=None):
+        n = self.A.shape[0]
+        alive = np.ones(n, dtype=bool) if alive is None else alive
+        sub = masked_csr(self.A, self.perm, alive, alive_edges)
+        n_alive = int(alive.sum())
+
+        labels, sizes, src, dst = condensation(sub, alive)
+        if len(sizes) <= self.exact_limit or not len(self.sources):
+            reach = reach_sizes(sizes, src, dst)
+            return {"unreachable_pairs": float((sizes * (n_alive - reach)).sum())}
+
+        sources = self.sources[alive[self.sources]]
+        missing = [n_alive - len(breadth_first_order(sub, s, directed=True, return_predecessors=False))
+                   for s in sources]
+        return {"unreachable_pairs": float(n_alive * np.mean(missing)) if missing else float("nan")}
+
+
+# Curvas de ataque por reinserção reversa
+
+# com poucos ks, uma máscara por k no CSR (scipy) sai mais barata que a
+# varredura em Python, cujo custo não depende de quantos ks são pedidos
+SWEEP_MIN_KS = 128
+
+def masked_attack_curve(A, order, ks, batch=32):
+    """
+    Mesma curva de attack_curve com uma máscara por k, avaliadas em lotes
+    de batch máscaras sobre a matriz CSR A.
+    """
+    n = A.shape[0]
+    order = np.asarray(order, dtype=np.int64)
+    ks = sorted(k for k in set(ks) if k <= len(order))
+    curve = {}
+    for start in range(0, len(ks), batch):
+        chunk = ks[start:start + batch]
+        masks = np.ones((len(chunk), n), dtype=bool)
+        for row, k in enumerate(chunk):
+            masks[row, order[:k]] = False
+        curve.update(zip(chunk, unbatch_metrics(compute_connectivity_metrics_batch(A, masks))))
+    return curve
+
+def attack_curve(G, order, ks=None, A=None):
+    """
+    Métricas de conectividade após remover order[:k], para cada k em ks,
+    numa única varredura: os vértices são reinseridos na ordem inversa.
+    Com menos de SWEEP_MIN_KS valores de k, usa masked_attack_curve sobre
+    A (a matriz CSR de G, montada aqui se não for passada).
+    """
+    if ks is not None and len(set(ks)) < SWEEP_MIN_KS:
+        return masked_attack_curve(igraph_to_csr(G) if A is None else A, order, ks)
 
     n = G.vcount()
-    disconnected_pairs = sum(len(c) * (n - len(c)) for c in comps) // 2
+    order = list(order)
+    wanted = set(range(len(order) + 1) if ks is None else ks)
+    succ = G.get_adjlist(mode="out")
+    pred = G.get_adjlist(mode="in")
 
-    return {
-        "n_components": num_components,
-        "largest_cc_size": largest_cc_size,
-        "disconnected_pairs": disconnected_pairs
-    }
+    engine = IncrementalSCC(n)
+    removed = set(order)
+    for v in range(n):
+        if v not in removed:
+            engine.add_vertex(v, succ[v], pred[v])
 
+    curve = {}
+    if len(order) in wanted:
+        curve[len(order)] = engine.metrics()
+    for k in range(len(order) - 1, -1, -1):
+        v = order[k]
+        engine.add_vertex(v, succ[v], pred[v])
+        if k in wanted:
+            curve[k] = engine.metrics()
+    return curve
 
-#Processamento do Grafo
 
-def process_graph(graphml_path):
+def weak_attack_curve(G, order, ks=None):
+    """
+    Mesma curva de attack_curve sobre a conectividade fraca (grafo não
+    dirigido): basta um union-find, à la Newman-Ziff.
+    """
+    n = G.vcount()
+    order = list(order)
+    wanted = set(range(len(order) + 1) if ks is None else ks)
+    adj = G.get_adjlist(mode="all")
+
+    parent = list(range(n))
+    size = [1] * n
+    alive = [False] * n
+    state = {"n_alive": 0, "n_components": 0, "sum_sq": 0, "largest": 0}
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def add(v):
+        alive[v] = True
+        state["n_alive"] += 1
+        state["n_components"] += 1
+        state["sum_sq"] += 1
+        for w in adj[v]:
+            if not alive[w]:
+                continue
+            a, b = find(v), find(w)
+            if a == b:
+                continue
+            if size[a] < size[b]:
+                a, b = b, a
+            state["sum_sq"] += 2 * size[a] * size[b]
+            parent[b] = a
+            size[a] += size[b]
+            state["n_components"] -= 1
+        state["largest"] = max(state["largest"], size[find(v)])
+
+    def metrics():
+        return {
+            "n_components": state["n_components"],
+            "largest_cc_size": state["largest"],
+            "disconnected_pairs": (state["n_alive"] ** 2 - state["sum_sq"]) // 2
+        }
+
+    removed = set(order)
+    for v in range(n):
+        if v not in removed:
+            add(v)
+
+    curve = {}
+    if len(order) in wanted:
+        curve[len(order)] = metrics()
+    for k in range(len(order) - 1, -1, -1):
+        add(order[k])
+        if k in wanted:
+            curve[k] = metrics()
+    return curve
+
+
+def edge_attack_curve(G, order, ks=None):
+    """
+    Métricas após remover as arestas order[:k], para cada k em ks, numa
+    única varredura: todos os vértices ficam vivos e as arestas são
+    reinseridas na ordem inversa com IncrementalSCC.add_edge.
+    """
+    n = G.vcount()
+    order = list(order)
+    wanted = set(range(len(order) + 1) if ks is None else ks)
+    edges = G.get_edgelist()
+
+    removed = set(order)
+    succ = [[] for _ in range(n)]
+    pred = [[] for _ in range(n)]
+    for e, (u, w) in enumerate(edges):
+        if e not in removed:
+            succ[u].append(w)
+            pred[w].append(u)
+
+    engine = IncrementalSCC(n)
+    for v in range(n):
+        engine.add_vertex(v, succ[v], pred[v])
+
+    curve = {}
+    if len(order) in wanted:
+        curve[len(order)] = engine.metrics()
+    for k in range(len(order) - 1, -1, -1):
+        engine.add_edge(*edges[order[k]])
+        if k in wanted:
+            curve[k] = engine.metrics()
+    return curve
+
 
-    if os.path.exists(graphml_path):
-        print("Carregando grafo do cache...")
-        G_nx = ox.load_graphml(graphml_path)
+def random_edge_order(m, rng=random, weights=None):
+    """
+    Permutação aleatória das arestas. Com weights (comprimento das vias) é
+    uma amostragem ponderada sem reposição (Efraimidis-Spirakis): cada
+    prefixo order[:k] é uma amostra de k arestas com chance proporcional ao peso.
+    """
+    if weights is None:
+        return rng.sample(range(m), m)
+    u = np.array([rng.random() for _ in range(m)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        keys = np.log(1.0 - u) / np.asarray(weights, dtype=float)
+    return np.argsort(-keys, kind="stable").tolist()
+
+
+# Ataques adaptativos (centralidade recalculada após cada lote de remoções)
+
+def betweenness_sample_size(n, epsilon=0.05, delta=0.1):
+    # limite de Hoeffding (Brandes-Pich): com essa quantidade de fontes a
+    # betweenness normalizada erra no máximo epsilon com probabilidade 1 - delta
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+def sampled_betweenness(G, n_samples, rng=random, weights=None):
+    n = G.vcount()
+    if n_samples >= n:
+        return G.betweenness(weights=weights)
+    sources = rng.sample(range(n), n_samples)
+    scale = n / n_samples
+    return [b * scale for b in G.betweenness(sources=sources, weights=weights)]
+
+def adaptive_removal_order(G, measure="betweenness", batch=1, max_removed=None,
+                           n_samples=None, epsilon=0.05, delta=0.1, rng=random):
+    """
+    Ordem de remoção de um ataque adaptativo: a cada lote de `batch` vértices
+    a centralidade é recalculada no grafo remanescente. A betweenness é
+    estimada por amostragem de fontes (n_samples fixo ou pelo limite epsilon/delta).
+    """
+    H = G.copy()
+    H.vs["orig"] = list(range(G.vcount()))
+    limit = G.vcount() if max_removed is None else max_removed
+    order = []
+
+    while len(order) < limit and H.vcount() > 0:
+        if measure == "degree":
+            scores = H.degree()
+        elif measure == "closeness":
+            scores = H.closeness(mode="ALL")
+        elif measure == "betweenness":
+            samples = n_samples or betweenness_sample_size(H.vcount(), epsilon, delta)
+            scores = sampled_betweenness(H, samples, rng)
+        else:
+            raise ValueError(f"Centralidade desconhecida: {measure}")
+
+        take = min(batch, limit - len(order))
+        top = np.argsort(-np.asarray(scores, dtype=float), kind="stable")[:take].tolist()
+        order.extend(H.vs[top]["orig"])
+        H.delete_vertices(top)
+
+    return order
+
+
+# Falhas em cascata (Motter–Lai)
+
+class LoadModel:
+    """
+    Carga dos vértices = betweenness, estimada a partir de um conjunto fixo
+    de fontes sorteadas com probabilidade s/n (escala n/s constante, então a
+    estimativa segue sem viés quando vértices caem). Com sources=None as
+    fontes são todos os vértices e a carga é a betweenness exata; baseline
+    permite reaproveitar a betweenness já calculada do grafo intacto.
+    """
+
+    def __init__(self, G, sources=None, baseline=None):
+        self.G = G
+        self.n = G.vcount()
+        self.A = igraph_to_csr(G)
+        self.At = self.A.T.tocsr()
+        self.is_source = np.zeros(self.n, dtype=bool)
+        self.is_source[np.arange(self.n) if sources is None else np.asarray(sources, dtype=np.int64)] = True
+        self.scale = self.n / max(1, self.is_source.sum())
+        if baseline is None:
+            baseline = self._betweenness(np.arange(self.n))
+        self.baseline = np.asarray(baseline, dtype=float)
+
+    def _betweenness(self, vertices):
+        # betweenness estimada dentro do subgrafo induzido por vertices (ordenados)
+        H = self.G.induced_subgraph(vertices.tolist())
+        sources = np.flatnonzero(self.is_source[vertices]).tolist()
+        if not sources:
+            return np.zeros(len(vertices))
+        return np.asarray(H.betweenness(sources=sources), dtype=float) * self.scale
+
+    def update(self, load, alive, failed):
+        """
+        Cargas após a queda de `failed`: só as componentes fracas vizinhas
+        das falhas são recalculadas; nas outras nenhum caminho mudou.
+        """
+        load = np.where(alive, load, 0.0)
+        A = masked_csr(self.A, np.arange(self.A.nnz), alive)
+        _, labels = connected_components(A, directed=True, connection="weak")
+        neighbors = np.concatenate((self.A[failed].indices, self.At[failed].indices))
+        neighbors = neighbors[alive[neighbors]]
+        affected = np.isin(labels, np.unique(labels[neighbors])) & alive
+        vertices = np.flatnonzero(affected)
+        if len(vertices):
+            load[vertices] = self._betweenness(vertices)
+        return load
+
+def cascade(model, removed, alpha, tolerance=1e-9):
+    """
+    Cascata de Motter–Lai: capacidade (1 + alpha) * carga inicial; após o
+    ataque inicial as cargas são recalculadas e os vértices sobrecarregados
+    caem, rodada a rodada, até nenhum passar da capacidade. Devolve a máscara
+    de vivos ao final e o número de rodadas com falhas.
+    """
+    capacity = (1 + alpha) * model.baseline * (1 + tolerance) + tolerance
+    alive = np.ones(model.n, dtype=bool)
+    alive[list(removed)] = False
+    load = model.baseline
+    failed = np.asarray(removed, dtype=np.int64)
+    rounds = 0
+    while len(failed):
+        load = model.update(load, alive, failed)
+        failed = np.flatnonzero(alive & (load > capacity))
+        if len(failed):
+            alive[failed] = False
+            rounds += 1
+    return alive, rounds
+
+
+# Ataques localizados (índice espacial)
+
+class SpatialIndex:
+    """
+    KD-tree sobre as coordenadas dos vértices, montada uma vez: cada cenário
+    (disco ou polígono) sai de uma consulta à árvore. Com as coordenadas
+    projetadas (grafo.x_proj, grafo.y_proj) os raios ficam em metros.
+    """
+
+    def __init__(self, x, y):
+        self.xy = np.column_stack((np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+        self.tree = cKDTree(self.xy)
+
+    def within_radius(self, centers, radius):
+        """Vértices a até radius de cada centro: uma lista de arrays, um por centro."""
+        found = self.tree.query_ball_point(np.atleast_2d(centers), radius, workers=-1)
+        return [np.sort(np.asarray(idx, dtype=np.int64)) for idx in found]
+
+    def within_polygon(self, polygon):
+        """Vértices dentro do polígono (nas mesmas coordenadas do índice)."""
+        minx, miny, maxx, maxy = polygon.bounds
+        center = ((minx + maxx) / 2, (miny + maxy) / 2)
+        candidates = self.within_radius(center, math.hypot(maxx - minx, maxy - miny) / 2)[0]
+        inside = shapely.contains_xy(polygon, self.xy[candidates, 0], self.xy[candidates, 1])
+        return candidates[inside]
+
+
+# Execução paralela das simulações
+
+_worker_graph = None
+_worker_csr = None
+_worker_edge_csr = None
+_worker_extras = []
+_worker_loads = None
+
+def _init_worker(n, edges, weights=None, paths=None, reach=None, loads=None):
+    # com paths = (fontes, confiança), as distâncias do grafo intacto também saem aqui,
+    # e com reach = (fontes, limite exato) as curvas ganham os pares inalcançáveis;
+    # loads = (fontes, carga inicial) monta o modelo de carga das cascatas
+    global _worker_graph, _worker_csr, _worker_edge_csr, _worker_extras, _worker_loads
+    _worker_graph = ig.Graph(n=n, edges=edges, directed=True)
+    if weights is not None:
+        _worker_graph.es["weight"] = weights
+    _worker_csr = igraph_to_csr(_worker_graph)
+    _worker_edge_csr = edge_csr(_worker_graph)
+    _worker_extras = []
+    if paths is not None:
+        _worker_extras.append(PathSampler(_worker_graph, *paths))
+    if reach is not None:
+        _worker_extras.append(ReachabilityCounter(_worker_graph, *reach))
+    _worker_loads = LoadModel(_worker_graph, *loads) if loads is not None else None
+
+def _masked_metrics(masks, edges=False, edge_masks=None):
+    # conectividade de cada máscara em lote (vértices vivos ou, com edges=True,
+    # arestas vivas) e as métricas extras sobre a mesma máscara; edge_masks
+    # acrescenta arestas removidas às máscaras de vértices
+    if edges:
+        pairs = [(None, mask) for mask in masks]
+        results = unbatch_metrics(compute_connectivity_metrics_edge_batch(*_worker_edge_csr, masks))
+    elif edge_masks is not None:
+        A, perm = _worker_edge_csr
+        pairs = list(zip(masks, edge_masks))
+        results = unbatch_metrics(compute_connectivity_metrics_batch(A, masks, perm, edge_masks))
     else:
-        print("Baixando grafo do OSM...")
-        G_nx = ox.graph_from_polygon(poly, custom_filter=custom_filter, network_type="drive")
-        ox.save_graphml(G_nx, graphml_path)
-        print("Grafo salvo no cache.")
-
-    #Checar cache do igraph
-    igraph_cache = os.path.join(CACHE_DIR, "grafo_igraph.pkl")
-    if os.path.exists(igraph_cache):
-        print("Carregando grafo iGraph do cache...")
-        G_ig, mapping = load_pickle(igraph_cache)
+        pairs = [(mask, None) for mask in masks]
+        results = unbatch_metrics(compute_connectivity_metrics_batch(_worker_csr, masks))
+    for extra in _worker_extras:
+        for metrics, (alive, alive_edges) in zip(results, pairs):
+            metrics.update(extra.metrics(alive=alive, alive_edges=alive_edges))
+    return results
+
+def _run_task(task):
+    kind = task[0]
+    G, extras = _worker_graph, _worker_extras
+    if kind == "pivots":
+        _, sources, weights = task
+        return pivot_contributions(G, sources, weights)
+    if kind == "centrality":
+        return np.asarray(compute_centrality(G, task[1]), dtype=float)
+
+    # cascata: um ataque inicial, uma cascata por alpha
+    if kind == "cascade":
+        _, removed, alphas = task
+        masks, extra_info = [], []
+        for alpha in alphas:
+            alive, rounds = cascade(_worker_loads, removed, alpha)
+            masks.append(alive)
+            extra_info.append({"n_failed": int(G.vcount() - len(removed) - alive.sum()), "rounds": rounds})
+        results = _masked_metrics(masks)
+        for metrics, info in zip(results, extra_info):
+            metrics.update(info)
+        return results
+
+    # ataques localizados: cada cenário é a lista de vértices removidos e,
+    # na malha contraída, a das super-arestas cujas cadeias cruzam a região
+    if kind == "localized":
+        _, scenarios, edge_scenarios = task
+        masks = []
+        for removed in scenarios:
+            mask = np.ones(G.vcount(), dtype=bool)
+            mask[removed] = False
+            masks.append(mask)
+        edge_masks = None
+        if edge_scenarios is not None:
+            edge_masks = []
+            for removed in edge_scenarios:
+                mask = np.ones(G.ecount(), dtype=bool)
+                mask[removed] = False
+                edge_masks.append(mask)
+        return _masked_metrics(masks, edge_masks=edge_masks)
+
+    # amostras independentes por k: métricas extras sobre a mesma máscara
+    if kind == "independent":
+        _, k, seeds = task
+        masks = [alive_mask_random(G.vcount(), k, rng=random.Random(seed)) for seed in seeds]
+        return _masked_metrics(masks)
+    if kind == "edge_independent":
+        _, k, seeds, weighted = task
+        weights = G.es["weight"] if weighted else None
+        masks = [alive_edge_mask_random(G.ecount(), k, random.Random(seed), weights) for seed in seeds]
+        return _masked_metrics(masks, edges=True)
+
+    # curvas: a ordem de remoção fica explícita para as métricas extras usarem a mesma
+    edges = kind.startswith("edge_")
+    if kind in ("ranking", "edge_ranking"):
+        _, order, ks = task
+    elif kind == "random":
+        _, seed, ks, mode = task
+        # uma permutação por execução: order[:k] é uma amostra uniforme de k
+        # vértices, como em alive_mask_random, e a curva inteira sai de uma vez
+        order = random.Random(seed).sample(range(G.vcount()), G.vcount())
+    elif kind == "adaptive":
+        _, measure, batch, seed, ks = task
+        max_removed = None if ks is None else max(ks)
+        order = adaptive_removal_order(G, measure, batch, max_removed, rng=random.Random(seed))
     else:
-        print("Convertendo para iGraph...")
-        G_ig, mapping = nx_to_igraph(G_nx)
-        save_pickle((G_ig, mapping), igraph_cache)
-        print("Grafo iGraph salvo em cache.")
-
-    #Checar cache das centralidades 
-    centralities_cache = os.path.join(CACHE_DIR, "centralities.pkl")
-    if os.path.exists(centralities_cache):
-        print("🔹 Carregando centralidades do cache...")
-        centralities = load_pickle(centralities_cache)
+        _, seed, ks, weighted = task
+        weights = G.es["weight"] if weighted else None
+        order = random_edge_order(G.ecount(), random.Random(seed), weights)
+
+    if edges:
+        curve = edge_attack_curve(G, order, ks)
+    elif kind == "random" and mode == "weak":
+        curve = weak_attack_curve(G, order, ks)
     else:
-        print("Calculando centralidades...")
-        centralities = compute_centralities_igraph(G_ig)
-        save_pickle(centralities, centralities_cache)
-        print("Centralidades salvas em cache.")
-
-    deg_rank = sort_ranking(centralities["degree"])
-    clo_rank = sort_ranking(centralities["closeness"])
-    bet_rank = sort_ranking(centralities["betweenness"])
-
-    #Checar cache de resultados 
-    results_cache = os.path.join(CACHE_DIR, "resultados.pkl")
-    if os.path.exists(results_cache):
-        print("🔹 Carregando resultados do cache...")
-        return load_pickle(results_cache)
-
-    # Simulações 
-    print("🔹 Executando simulações...")
-    resultados = {
-        "centralities": centralities,
-        "degree_rank": deg_rank,
-        "closeness_rank": clo_rank,
-        "betweenness_rank": bet_rank,
-        "simulations": {}
-    }
+        curve = attack_curve(G, order, ks, A=_worker_csr)
+    for extra in extras:
+        extra.add_to_curve(curve, order, edges)
+    return curve
+
+def task_seed(master_seed, *key):
+    # semente própria por execução: o resultado não depende de qual processo a executa
+    return ":".join(str(part) for part in (master_seed,) + key)
+
+def iter_tasks(G, tasks, n_workers=1, desc="Simulações", paths=None, reach=None, loads=None):
+    """
+    Executa as tarefas de simulação com mapa_paralelo: em série (n_workers <= 1)
+    ou num pool de processos (n_workers=None usa todos os núcleos). Os resultados são
+    entregues um a um, na ordem das tarefas, e são idênticos nos dois modos.
+    Com paths = (fontes, confiança) as curvas ganham as métricas de PathSampler,
+    e com reach = (fontes, limite exato) as de ReachabilityCounter; loads =
+    (fontes, carga inicial) é o modelo de carga das tarefas de cascata.
+    """
+    weights = G.es["weight"] if "weight" in G.es.attributes() else None
+    yield from mapa_paralelo(_run_task, tasks, _init_worker, carga_grafo(G) + (weights, paths, reach, loads),
+                             n_workers, desc)
+
+def run_tasks(G, tasks, n_workers=1, desc="Simulações"):
+    return list(iter_tasks(G, tasks, n_workers, desc))
+
+
+# Grade de k adaptativa
+
+def refine_ks(evaluate, lo, hi, budget, initial=11, per_round=None):
+    """
+    Grade não uniforme de k em [lo, hi] com até `budget` pontos: começa com
+    `initial` pontos igualmente espaçados e, a cada rodada, divide ao meio os
+    intervalos em que alguma série muda mais. evaluate(ks) devolve um array
+    (séries, len(ks)) e só é chamado para os pontos novos.
+    """
+    budget = min(budget, hi - lo + 1)
+    ks = np.unique(np.linspace(lo, hi, min(initial, budget)).astype(np.int64))
+    values = np.asarray(evaluate(ks.tolist()), dtype=float)
+    per_round = per_round or max(1, budget // 10)
+    while len(ks) < budget:
+        # variação em cada intervalo, relativa à amplitude da série
+        span = np.ptp(values, axis=1, keepdims=True)
+        change = (np.abs(np.diff(values, axis=1)) / np.where(span > 0, span, 1)).max(axis=0)
+        width = np.diff(ks)
+        split = np.flatnonzero(width > 1)
+        if not len(split):
+            break
+        # maior variação primeiro; entre intervalos planos, o mais largo
+        split = split[np.lexsort((-width[split], -change[split]))][:min(per_round, budget - len(ks))]
+        new = (ks[split] + ks[split + 1]) // 2
+        ks = np.concatenate((ks, new))
+        values = np.concatenate((values, np.asarray(evaluate(new.tolist()), dtype=float)), axis=1)
+        order = np.argsort(ks)
+        ks, values = ks[order], values[:, order]
+    return ks.tolist()
+
+def pilot_evaluator(G, orders, metric="largest_cc_size", n_random=0):
+    """
+    evaluate(ks) para refine_ks a partir de curvas-piloto: uma varredura de
+    reinserção por ordem dá a métrica em todos os k. As n_random últimas
+    ordens são aleatórias e entram como uma única série (a média).
+    """
+    curves = [attack_curve(G, order) for order in orders]
+
+    def evaluate(ks):
+        rows = np.array([[curve[k][metric] for k in ks] for curve in curves], dtype=float)
+        if n_random:
+            rows = np.vstack((rows[:len(rows) - n_random], rows[len(rows) - n_random:].mean(axis=0)))
+        return rows
+    return evaluate
+
+
+# Simulações
+
+def run_simulations(G_ig, centralities, ks=None, random_runs_list=(10, 20, 100),
+                    random_mode="strong", n_workers=1, seed=None, adaptive=(), adaptive_batch=None,
+                    checkpoint=None, edge_attacks=(), edge_centralities=None,
+                    path_samples=0, path_confidence=0.95,
+                    reachability=False, reach_exact_limit=20000, reach_samples=200,
+                    random_target=None, random_confidence=0.95, random_batch=None,
+                    k_budget=None, k_metric="largest_cc_size", k_pilot_runs=5):
+    """
+    Roda a grade de simulações, com um ataque por ranking para cada medida da
+    CentralityTable centralities. Com checkpoint (caminho de um CheckpointLog),
+    cada bloco concluído vai direto para o disco e uma execução interrompida
+    retoma do ponto em que parou, com a mesma semente mestre.
+
+    edge_attacks escolhe ataques a arestas ("edge_betweenness", "strong_bridges",
+    "edge_random", "edge_length_random"); cada k da grade vira a mesma fração
+    das arestas, e os rankings vêm de compute_edge_centralities.
+
+    Com path_samples > 0, cada ponto ganha eficiência global e inflação dos
+    caminhos mínimos ponderados (PathSampler), estimadas a partir de
+    path_samples fontes sorteadas uma vez e reaproveitadas em toda a grade,
+    com intervalo de confiança de nível path_confidence.
+
+    Com reachability=True, cada ponto ganha unreachable_pairs: pares ordenados
+    (x, y) em que y deixou de ser alcançável a partir de x (ReachabilityCounter),
+    exato enquanto o DAG de condensação tem até reach_exact_limit componentes e
+    estimado a partir de reach_samples fontes fixas acima disso.
+
+    As execuções aleatórias formam um conjunto por tipo de sorteio e os
+    ensembles menores são prefixos dele (random_10 = 10 primeiras de random_100).
+    random_mode escolhe como elas são medidas: "strong" (padrão) usa as
+    componentes fortemente conexas, como os rankings; "independent" também,
+    com uma amostra por (k, execução) e custo da mesma ordem. "weak" mede a
+    conectividade fraca com union-find, cerca de 2-3x mais barato, mas não é
+    comparável aos rankings (ignora o sentido das vias): as suas execuções
+    ficam em random_weak_10, random_weak_20... em vez de random_10, random_20...
+    Com random_target, as execuções saem em lotes de random_batch e param
+    quando a semi-amplitude do IC (nível random_confidence) da média de cada
+    métrica fica abaixo de random_target * |média|, em cada k no modo
+    "independent" ou na curva inteira nos demais; max(random_runs_list) é o teto.
+
+    Sem ks e com k_budget, a grade é refinada por refine_ks: k_budget pontos
+    concentrados onde k_metric muda mais nas curvas-piloto dos três rankings
+    e da média de k_pilot_runs permutações aleatórias.
+    """
+    rankings = [(measure, centralities.ranking(measure)) for measure in centralities.measures]
+
+    log = CheckpointLog(checkpoint) if checkpoint else None
+    master_seed = log.get(("seed",)) if log else None
+    if master_seed is None:
+        master_seed = random.randrange(2 ** 32) if seed is None else seed
+        if log:
+            log.append(("seed",), master_seed)
+    done = log.keys() if log else set()
+    if len(done) > 1:
+        print(f"Retomando simulações: {len(done) - 1} blocos já concluídos.")
 
     N = G_ig.vcount()
-    ks = [int(N * p / 100) for p in range(1, 101)]
-    random_runs_list = [10, 20, 100]
-
-    for k in tqdm(ks, desc="Simulações", unit="k removidos"):
-        res = {}
-        # por centralidade
-        res["degree"] = compute_connectivity_metrics(remove_nodes_by_centrality_fixed_ranking(G_ig, k, deg_rank))
-        res["closeness"] = compute_connectivity_metrics(remove_nodes_by_centrality_fixed_ranking(G_ig, k, clo_rank))
-        res["betweenness"] = compute_connectivity_metrics(remove_nodes_by_centrality_fixed_ranking(G_ig, k, bet_rank))
-
-        # aleatórios
-        for r in random_runs_list:
-            metrics_list = []
-            for _ in range(r):
-                metrics_list.append(compute_connectivity_metrics(remove_nodes_random(G_ig, k)))
-            res[f"random_{r}"] = metrics_list
-
-        resultados["simulations"][k] = res
-
-    save_pickle(resultados, results_cache)
-    print("✅ Resultados salvos em cache.")
+    if ks is None and k_budget:
+        pilot = [random.Random(task_seed(master_seed, "pilot", i)).sample(range(N), N)
+                 for i in range(k_pilot_runs)]
+        evaluate = pilot_evaluator(G_ig, [rank for _, rank in rankings] + pilot, k_metric, k_pilot_runs)
+        ks = refine_ks(evaluate, N // 100, N, k_budget)
+    elif ks is None:
+        ks = [int(N * p / 100) for p in range(1, 101)]
+
+    # cada bloco é independente: chave (rótulo, k ou None para curva inteira, execução);
+    # no modo "independent" as execuções de um mesmo k são avaliadas em lote
+    # por centralidade: uma varredura de reinserção por ranking cobre todos os k
+    jobs = [((label, None, None), ("ranking", rank, ks)) for label, rank in rankings]
+    # adaptativos: centralidade recalculada a cada lote (por padrão 1% dos vértices)
+    batch = adaptive_batch or max(1, N // 100)
+    for measure in adaptive:
+        label = f"{measure}_adaptive"
+        jobs.append(((label, None, None), ("adaptive", measure, batch, task_seed(master_seed, label), ks)))
+    strategies = [key[0] for key, _ in jobs]
+
+    # aleatórios: um único conjunto de execuções por tipo de sorteio ("pool");
+    # random_10 e random_20 são as primeiras 10 e 20 execuções de random_100.
+    # "strong"/"weak" sorteiam uma permutação por execução e obtêm a curva
+    # inteira de uma vez; "independent" sorteia uma amostra por (k, execução).
+    # a conectividade fraca tem rótulos próprios para não ser confundida com
+    # a linha de base comparável aos rankings
+    M = G_ig.ecount()
+    edge_ks = [k * M // N for k in ks]
+    node_pool = "random_weak" if random_mode == "weak" else "random"
+    pools = []
+    if random_runs_list:
+        pools.append(node_pool)
+        strategies += [f"{node_pool}_{r}" for r in random_runs_list]
+
+    # ataques a arestas: mesma fração removida em cada ponto da grade
+    edge_labels = []
+    for attack in edge_attacks:
+        if attack == "edge_betweenness":
+            rank = sort_ranking(edge_centralities["edge_betweenness"])
+        elif attack == "strong_bridges":
+            rank = strong_bridges_ranking(edge_centralities["strong_bridges"],
+                                          edge_centralities["edge_betweenness"])
+        elif attack in ("edge_random", "edge_length_random"):
+            if random_runs_list:
+                pools.append(attack)
+                edge_labels.append(attack)
+                strategies += [f"{attack}_{r}" for r in random_runs_list]
+            continue
+        else:
+            raise ValueError(f"Ataque a arestas desconhecido: {attack}")
+        edge_labels.append(attack)
+        strategies.append(attack)
+        jobs.append(((attack, None, None), ("edge_ranking", rank, edge_ks)))
+
+    def pool_jobs(pool, k, start, stop):
+        # execuções start..stop-1 de um pool; k=None: uma curva inteira por execução
+        weighted = pool == "edge_length_random"
+        if k is None:
+            return [((pool, None, i),
+                     ("random", task_seed(master_seed, pool, i), ks, random_mode) if pool == node_pool
+                     else ("edge_random", task_seed(master_seed, pool, i), edge_ks, weighted))
+                    for i in range(start, stop)]
+        seeds = [task_seed(master_seed, pool, i, k) for i in range(start, stop)]
+        task = ("independent", k, seeds) if pool == node_pool else ("edge_independent", k, seeds, weighted)
+        return [((pool, k, start), task)]
+
+    paths = None
+    if path_samples:
+        sources = random.Random(task_seed(master_seed, "paths")).sample(range(N), min(path_samples, N))
+        paths = (sources, path_confidence)
+    reach = None
+    if reachability:
+        sources = random.Random(task_seed(master_seed, "reach")).sample(range(N), min(reach_samples, N))
+        reach = (sources, reach_exact_limit)
+
+    # resultado colunar: um array por métrica com eixos (estratégia, k, execução)
+    max_runs = max(random_runs_list, default=0)
+    runs = {f"{pool}_{r}": r for r in random_runs_list for pool in pools}
+    resultados = ResultadosColunares.vazio(strategies, [runs.get(label, 1) for label in strategies],
+                                           ks, seed=master_seed, edge_ks=edge_ks, edge_strategies=edge_labels,
+                                           n=N, m=M)
+    # posições na grade de cada k (em arestas, dois pontos da grade podem cair no mesmo k)
+    k_index, edge_index = {}, {}
+    for j, (k, ke) in enumerate(zip(ks, edge_ks)):
+        k_index.setdefault(k, []).append(j)
+        edge_index.setdefault(ke, []).append(j)
+    edge_labels = set(edge_labels)
+
+    def record(key, output):
+        label, k, i = key
+        index = edge_index if label in edge_labels else k_index
+        if k is not None:
+            rows = [(j, i + t, metrics) for t, metrics in enumerate(output) for j in index[k]]
+        else:
+            rows = [(j, i or 0, metrics) for kk, metrics in output.items() for j in index[kk]]
+        # uma execução do pool entra em todos os conjuntos que a contêm
+        targets = [(f"{label}_{r}", r) for r in random_runs_list] if label in pools else [(label, None)]
+        for target, r in targets:
+            for j, run, metrics in rows:
+                if r is None or run < r:
+                    resultados.gravar(target, j, run, metrics)
+
+    z = NormalDist().inv_cdf((1 + random_confidence) / 2)
+
+    def converged(pool, k, n):
+        # semi-amplitude do IC da média <= random_target * |média| em todas as métricas
+        if n < 2:
+            return False
+        index = edge_index if pool in edge_labels else k_index
+        rows = [j for js in index.values() for j in js] if k is None else index[k]
+        for metric in resultados.metrics:
+            if metric.endswith("_ci"):
+                continue
+            values = np.asarray(resultados.valores(metric, f"{pool}_{max_runs}")[rows, :n], dtype=float)
+            half = z * values.std(axis=1, ddof=1) / math.sqrt(n)
+            if np.any(half > random_target * np.abs(values.mean(axis=1))):
+                return False
+        return True
+
+    if log:
+        for key, output in log:
+            if key != ("seed",):
+                record(key, output)
+
+    # rodadas: sem random_target todas as execuções saem na primeira; com ele,
+    # cada pool (ou cada k, no modo "independent") ganha lotes de random_batch
+    # execuções até o IC de todas as métricas ficar estreito ou chegar a max_runs
+    run_batch = max_runs if random_target is None else (random_batch or min(random_runs_list, default=1))
+    points = {}
+    for pool in pools:
+        if random_mode != "independent":
+            points[(pool, None)] = 0
+        else:
+            for k in sorted(set(edge_ks if pool in edge_labels else ks)):
+                points[(pool, k)] = 0
+
+    round_jobs = jobs
+    while True:
+        for (pool, k), n in points.items():
+            if n >= max_runs or converged(pool, k, n):
+                continue
+            stop = min(n + run_batch, max_runs)
+            round_jobs = round_jobs + pool_jobs(pool, k, n, stop)
+            points[(pool, k)] = stop
+        if not round_jobs:
+            break
+        pending = [(key, task) for key, task in round_jobs if key not in done]
+        outputs = iter_tasks(G_ig, [task for _, task in pending], n_workers, paths=paths, reach=reach)
+        for (key, _), output in zip(pending, outputs):
+            if log:
+                log.append(key, output)
+            record(key, output)
+        round_jobs = []
+
     return resultados
 
 
+def run_cascades(G_ig, centralities, alphas=(0.0, 0.1, 0.25, 0.5, 1.0), ks=None,
+                 attacks=("betweenness", "degree", "random"), random_runs=10, n_sources=200,
+                 seed=None, n_workers=1):
+    """
+    Varredura de cascatas de Motter–Lai: para cada ataque inicial (os k
+    primeiros de um ranking ou k vértices aleatórios) e cada alpha, a cascata
+    roda até parar e o estado final é medido. A carga é a betweenness estimada
+    por n_sources fontes fixas (LoadModel); com n_sources=None ela é exata e a
+    carga inicial é a betweenness de centralities. Devolve colunas NumPy com
+    uma linha por (ataque, k, execução, alpha): n_failed são as falhas além do
+    ataque inicial e rounds as rodadas da cascata.
+    """
+    N = G_ig.vcount()
+    if ks is None:
+        ks = [N // 100, N // 50, N // 20]
+    master_seed = random.randrange(2 ** 32) if seed is None else seed
+
+    if n_sources is None:
+        sources = None
+        baseline = centralities["betweenness"]
+    else:
+        sources = random.Random(task_seed(master_seed, "loads")).sample(range(N), min(n_sources, N))
+        baseline = LoadModel(G_ig, sources).baseline
+
+    rows, tasks = [], []
+    for attack in attacks:
+        for k in ks:
+            if attack == "random":
+                for i in range(random_runs):
+                    removed = random.Random(task_seed(master_seed, "random", i, k)).sample(range(N), k)
+                    rows.append((attack, k, i))
+                    tasks.append(("cascade", removed, list(alphas)))
+            else:
+                rows.append((attack, k, 0))
+                tasks.append(("cascade", centralities.ranking(attack)[:k].tolist(), list(alphas)))
+
+    results = list(iter_tasks(G_ig, tasks, n_workers, desc="Cascatas", loads=(sources, baseline)))
+    table = {
+        "attack": np.array([attack for attack, _, _ in rows for _ in alphas]),
+        "k": np.array([k for _, k, _ in rows for _ in alphas], dtype=np.int64),
+        "run": np.array([i for _, _, i in rows for _ in alphas], dtype=np.int64),
+        "alpha": np.tile(np.asarray(alphas, dtype=float), len(rows)),
+    }
+    flat = [metrics for block in results for metrics in block]
+    for metric in (flat[0] if flat else {}):
+        table[metric] = np.array([metrics[metric] for metrics in flat])
+    return table
+
+def run_localized_attacks(G_ig, x, y, radii=(250, 500, 1000, 2000), n_centers=200, centers=None,
+                          polygons=(), seed=None, n_workers=1, chunk=256, contraido=None):
+    """
+    Ataques localizados (alagamentos, eventos, obras): remove todos os vértices
+    a até r de cada centro, para cada r em radii, e os de dentro de cada
+    polígono. Os centros são n_centers vértices sorteados com seed, ou os
+    pontos em centers. Os cenários vão em lotes de chunk para o mesmo pool
+    das simulações. Devolve colunas NumPy com uma linha por cenário:
+    center_x, center_y, radius (NaN nos polígonos), n_removed e as métricas.
+
+    Com contraido (GrafoContraido de G_ig), x e y são as coordenadas do grafo
+    completo: a região é selecionada nele e levada à malha contraída por
+    GrafoContraido.selecao_contraida; n_removed conta vértices originais.
+    """
+    index = SpatialIndex(x, y)
+    if centers is None:
+        picks = random.Random(seed).sample(range(len(index.xy)), min(n_centers, len(index.xy)))
+        centers = index.xy[picks]
+    centers = np.atleast_2d(np.asarray(centers, dtype=float))
+
+    scenarios, rows = [], []
+    for r in radii:
+        scenarios += index.within_radius(centers, r)
+        rows += [(cx, cy, r) for cx, cy in centers]
+    for polygon in polygons:
+        scenarios.append(index.within_polygon(polygon))
+        rows.append((polygon.centroid.x, polygon.centroid.y, math.nan))
+
+    vertex_scenarios, edge_scenarios = scenarios, None
+    if contraido is not None:
+        selections = [contraido.selecao_contraida(removed) for removed in scenarios]
+        vertex_scenarios = [vertices for vertices, _ in selections]
+        edge_scenarios = [edges for _, edges in selections]
+    tasks = [("localized", vertex_scenarios[i:i + chunk],
+              None if edge_scenarios is None else edge_scenarios[i:i + chunk])
+             for i in range(0, len(scenarios), chunk)]
+    results = [metrics for block in iter_tasks(G_ig, tasks, n_workers, desc="Ataques localizados")
+               for metrics in block]
+
+    rows = np.array(rows, dtype=float).reshape(-1, 3)
+    table = {
+        "center_x": rows[:, 0],
+        "center_y": rows[:, 1],
+        "radius": rows[:, 2],
+        "n_removed": np.array([len(removed) for removed in scenarios], dtype=np.int64),
+    }
+    for metric in (results[0] if results else {}):
+        table[metric] = np.array([metrics[metric] for metrics in results])
+    return table
+
+
+#Processamento do Grafo
+
+def load_graph(graphml_path=None, contract=False):
+    """
+    (grafo, chave) da malha; com contract=True, a malha com as cadeias de
+    grau 2 contraídas (GrafoContraido): só os cruzamentos viram vértices e
+    grafo.projetar_vertices/projetar_arestas levam resultados ao grafo completo.
+    """
+    grafo, graph_key = carregar_grafo(coords, custom_filter, graphml_path=graphml_path)
+    if contract:
+        grafo, graph_key = carregar_contraido(grafo, graph_key)
+    return grafo, graph_key
+
+def load_centralities(G_ig, graph_key, measures=BASE_CENTRALITIES, method="exact", samples=None,
+                      seed=None, n_workers=1):
+    """Etapa de centralidades do cache: (CentralityTable, chave)."""
+    def compute():
+        if method == "approx":
+            return compute_centralities_approx(G_ig, samples, n_workers=n_workers, seed=seed,
+                                               measures=measures)
+        return compute_centralities_igraph(G_ig, measures, n_workers)
+
+    params = {"method": method, "format": CentralityTable.VERSION, "measures": list(measures)}
+    if method == "approx":
+        # "hops": tabelas antigas estimavam betweenness/closeness pelo comprimento
+        params.update(samples=samples, seed=seed, distance="hops")
+    return cached("centralities", params, [graph_key], compute, label="centralidades")
+
+def process_graph(graphml_path=None, ks=None, random_runs_list=(10, 20, 100), random_mode="strong",
+                  n_workers=1, seed=None, adaptive=(), adaptive_batch=None,
+                  centrality_method="exact", centrality_samples=None, edge_attacks=(),
+                  path_samples=0, path_confidence=0.95,
+                  reachability=False, reach_exact_limit=20000, reach_samples=200,
+                  random_target=None, random_confidence=0.95, random_batch=None,
+                  k_budget=None, k_metric="largest_cc_size", k_pilot_runs=5,
+                  centrality_measures=BASE_CENTRALITIES, contract=False):
+    """
+    Cada etapa (grafo, centralidades, resultados) é buscada no cache pela
+    chave dos seus parâmetros e das etapas anteriores; só é recalculado o
+    que mudou. n_workers não entra na chave: o resultado não depende dele.
+    Cada medida em centrality_measures (BASE_CENTRALITIES + EXTRA_CENTRALITIES)
+    vira um ataque por ranking. random_mode segue run_simulations: o padrão
+    "strong" é o comparável aos rankings; "weak" sai com rótulos próprios.
+
+    Com contract=True tudo roda na malha contraída (load_graph) e k conta
+    cruzamentos. Os rankings voltam ao grafo completo: o resultado guarda
+    keep e, para cada medida, a ordem de remoção em índices originais
+    (ResultadosColunares.ordem_original / removidos_originais). As métricas
+    de cada k continuam contadas em cruzamentos: os vértices interiores das
+    cadeias não são removidos nem entram nos tamanhos de componente, e os
+    ataques adaptativos e a arestas não têm ordem projetada.
+    """
+    grafo, graph_key = load_graph(graphml_path, contract)
+    G_ig = grafo.igraph()
+    centralities, centralities_key = load_centralities(G_ig, graph_key, centrality_measures, centrality_method,
+                                                       centrality_samples, seed, n_workers)
+
+    edge_centralities = None
+    simulation_deps = [graph_key, centralities_key]
+    if {"edge_betweenness", "strong_bridges"} & set(edge_attacks):
+        edge_centralities, edge_key = cached(
+            "edge_centralities", {}, [graph_key], lambda: compute_edge_centralities(G_ig),
+            label="centralidades de arestas")
+        simulation_deps.append(edge_key)
+
+    simulation_params = {
+        "format": FORMAT_VERSION, "ks": ks, "random_runs_list": list(random_runs_list), "random_mode": random_mode,
+        "seed": seed, "adaptive": list(adaptive), "adaptive_batch": adaptive_batch,
+    }
+    if edge_attacks:
+        simulation_params["edge_attacks"] = list(edge_attacks)
+    if path_samples:
+        simulation_params.update(path_samples=path_samples, path_confidence=path_confidence)
+    if reachability:
+        simulation_params.update(reach_exact_limit=reach_exact_limit, reach_samples=reach_samples)
+    if random_target is not None:
+        simulation_params.update(random_target=random_target, random_confidence=random_confidence,
+                                 random_batch=random_batch)
+    if ks is None and k_budget:
+        simulation_params.update(k_budget=k_budget, k_metric=k_metric, k_pilot_runs=k_pilot_runs)
+    if contract:
+        # artefatos da malha contraída sem as ordens projetadas não são reaproveitados
+        simulation_params["projection"] = 1
+    # blocos concluídos ficam no checkpoint até o artefato final ser salvo
+    checkpoint = artifact_path(artifact_key("resultados", simulation_params, simulation_deps), ".parcial")
+    def simulate():
+        resultados = run_simulations(
+            G_ig, centralities, ks=ks, random_runs_list=random_runs_list, random_mode=random_mode,
+            n_workers=n_workers, seed=seed, adaptive=adaptive, adaptive_batch=adaptive_batch,
+            checkpoint=checkpoint, edge_attacks=edge_attacks, edge_centralities=edge_centralities,
+            path_samples=path_samples, path_confidence=path_confidence,
+            reachability=reachability, reach_exact_limit=reach_exact_limit, reach_samples=reach_samples,
+            random_target=random_target, random_confidence=random_confidence, random_batch=random_batch,
+            k_budget=k_budget, k_metric=k_metric, k_pilot_runs=k_pilot_runs)
+        if contract:
+            resultados.projetar_contracao(grafo.keep, grafo.meta["n_original"],
+                                          {m: centralities.ranking(m) for m in centralities.measures})
+        return resultados
+
+    resultados, _ = cached(
+        "resultados", simulation_params, simulation_deps, simulate,
+        ext="", save=lambda resultados, path: resultados.salvar(path),
+        load=ResultadosColunares.abrir, label="resultados")
+    CheckpointLog(checkpoint).remove()
+    return resultados
+
+
+def process_localized(graphml_path=None, radii=(250, 500, 1000, 2000), n_centers=200, polygons=(),
+                      seed=None, n_workers=1, contract=False):
+    """
+    Ataques localizados sobre as coordenadas projetadas (UTM, metros) do
+    grafo; polígonos também em UTM. O resultado fica no cache como as demais
+    etapas. Com contract=True as regiões são selecionadas no grafo completo
+    e os ataques rodam na malha contraída (run_localized_attacks).
+    """
+    grafo, graph_key = load_graph(graphml_path)
+    analise, analise_key = carregar_contraido(grafo, graph_key) if contract else (grafo, graph_key)
+    params = {"radii": list(radii), "n_centers": n_centers, "seed": seed,
+              "polygons": [polygon.wkt for polygon in polygons]}
+    if contract:
+        # artefatos antigos selecionavam só os cruzamentos: não são reaproveitados
+        params["selection"] = "original"
+    table, _ = cached(
+        "localized_attacks", params, [analise_key],
+        lambda: run_localized_attacks(analise.igraph(), grafo.x_proj, grafo.y_proj, radii, n_centers,
+                                      polygons=polygons, seed=seed, n_workers=n_workers,
+                                      contraido=analise if contract else None),
+        label="ataques localizados")
+    return table
+
+
+def process_cascades(graphml_path=None, alphas=(0.0, 0.1, 0.25, 0.5, 1.0), ks=None,
+                     attacks=("betweenness", "degree", "random"), random_runs=10, n_sources=200,
+                     seed=None, n_workers=1, contract=False):
+    """Cascatas de Motter–Lai sobre as centralidades exatas do cache."""
+    grafo, graph_key = load_graph(graphml_path, contract)
+    G_ig = grafo.igraph()
+    measures = list(dict.fromkeys(list(BASE_CENTRALITIES) + [a for a in attacks if a != "random"]))
+    centralities, centralities_key = load_centralities(G_ig, graph_key, measures, n_workers=n_workers)
+    params = {"alphas": list(alphas), "ks": ks, "attacks": list(attacks), "random_runs": random_runs,
+              "n_sources": n_sources, "seed": seed}
+    table, _ = cached(
+        "cascades", params, [graph_key, centralities_key],
+        lambda: run_cascades(G_ig, centralities, alphas, ks, attacks, random_runs, n_sources,
+                             seed, n_workers),
+        label="cascatas")
+    return table
+
+
 #Executa
 
 if __name__ == "__main__":
-    graph_file = "dados_cache/grafo.graphml"
-    resultados = process_graph(graph_file)
+    resultados = process_graph()
 
-    ks = sorted(resultados["simulations"].keys())
+    # a grade pode não ser uniforme (k_budget): o eixo x é a fração real removida
+    percent_removed = resultados.ks / resultados.meta["n"] * 100
 
     def get_metric_series(metric):
-        series = {}
-        for label in ["degree", "closeness", "betweenness"]:
-            series[label] = [resultados["simulations"][k][label][metric] for k in ks]
-        for r in [10, 20, 50]:
-            series[f"random_{r}"] = [sum(res[metric] for res in resultados["simulations"][k][f"random_{r}"]) / r for k in ks]
-        return series
+        # determinísticas têm uma execução; nas aleatórias a série é a média das execuções
+        return {label: resultados.media(metric, label) for label in resultados.strategies}
 
     disconnected_pairs = get_metric_series("disconnected_pairs")
     n_components = get_metric_series("n_components")
     largest_cc = get_metric_series("largest_cc_size")
 
 
-    def plot_metric(series, title, ylabel):
+    def plot_metric(series, title, ylabel, integer=True):
 
         linestyles = ['-', '--', ':', '-.', '--', '--']
         markers = [None, None, None, None, 'o', '^']
@@ -241,7 +1595,7 @@ if __name__ == "__main__":
             ls = linestyles[i % len(linestyles)]
             m = markers[i % len(markers)]
             ms = markersizes[i % len(markersizes)]
-            plt.plot([k/len(ks)*100 for k in ks], values, label=label,
+            plt.plot(percent_removed, values, label=label,
                     linestyle=ls, marker=m, markersize=ms if ms else None)
         plt.xlabel("Percentage of nodes removed")
         plt.ylabel(ylabel)
@@ -249,7 +1603,8 @@ if __name__ == "__main__":
         plt.grid(False)
         plt.legend()
 
-        plt.gca().yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'{int(x):,}'))
+        if integer:
+            plt.gca().yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'{int(x):,}'))
         plt.show()
 
         # Eixo logarítmico
@@ -258,7 +1613,7 @@ if __name__ == "__main__":
             ls = linestyles[i % len(linestyles)]
             m = markers[i % len(markers)]
             ms = markersizes[i % len(markersizes)]
-            plt.plot([k/len(ks)*100 for k in ks], values, label=label,
+            plt.plot(percent_removed, values, label=label,
                     linestyle=ls, marker=m, markersize=ms if ms else None)
         plt.xlabel("Percentage of nodes removed")
         plt.ylabel(ylabel)
@@ -273,3 +1628,13 @@ if __name__ == "__main__":
     plot_metric(disconnected_pairs, "Disconnected Pairs vs Node Removal", "Disconnected Pairs")
     plot_metric(n_components, "Number of Components vs Node Removal", "Number of Components")
     plot_metric(largest_cc, "Largest Connected Component vs Node Removal", "Largest CC Size")
+    # métricas ponderadas (process_graph(path_samples=...))
+    if "efficiency" in resultados.metrics:
+        plot_metric(get_metric_series("efficiency"), "Global Efficiency vs Node Removal",
+                    "Global Efficiency", integer=False)
+        plot_metric(get_metric_series("path_inflation"), "Shortest-Path Inflation vs Node Removal",
+                    "Mean Path Length Ratio", integer=False)
+    # alcançabilidade ordenada (process_graph(reachability=True))
+    if "unreachable_pairs" in resultados.metrics:
+        plot_metric(get_metric_series("unreachable_pairs"), "Unreachable Ordered Pairs vs Node Removal",
+                    "Unreachable Ordered Pairs")
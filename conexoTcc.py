@@ -1,11 +1,17 @@
 import os
 import igraph as ig
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 from shapely.geometry import Polygon
-import osmnx as ox
-import networkx as nx
+from cache import CACHE_DIR, cached
+from renderizacao import arestas_unicas, camada_arestas, figura_mapa, posicoes, salvar_html
+from grafo import carregar_contraido, carregar_grafo
+from paralelo import carga_grafo, mapa_paralelo
 
-CACHE_DIR = "dados_cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 # -------------------
@@ -39,173 +45,304 @@ custom_filter = (
 # Carregar ou baixar grafo
 # -------------------
 def iniciarGrafo():
-    path = os.path.join(CACHE_DIR, "grafo.graphml")
-    if os.path.exists(path):
-        print("Carregando grafo do cache...")
-        G = ox.load_graphml(path)
-    else:
-        print("Baixando grafo do OSM...")
-        G = ox.graph_from_polygon(poly, custom_filter=custom_filter, network_type="drive")
-        ox.save_graphml(G, path)
-        print("Grafo salvo no cache.")
-    return G
-
-G_nx = iniciarGrafo()
-
-def edge_dominators(G, s):
-    """
-    Retorna o conjunto DE(s):
-    Todas as arestas (u, v) tais que u = idom[v]
-    """
-    idom = nx.immediate_dominators(G, s)
-    EDom = set()
-
-    for u, v in G.edges():
-        if v in idom and idom[v] == u:
-            EDom.add((u, v))
-
-    return EDom
-
-
-def StrongBridges(G):
-
-    # 1. Escolhe vértice arbitrário s
-    s = next(iter(G.nodes))
-
-    # 2. Dominadores de arestas no grafo original
-    DE = edge_dominators(G, s)
-
-    # 3. Grafo reverso
-    GR = G.reverse(copy=True)
-
-    # 4. Dominadores no grafo reverso
-    DER = edge_dominators(GR, s)
-
-    # 5. Reverter arestas de DER
-    DER_reversed = {(v, u) for (u, v) in DER}
-
-    # União
-    return DE.union(DER_reversed)
-
-
-"""Trecho necessário por conta de 1 estacionamento de mão única que separa o grafo em 2 componentes fortemente conexas"""
-sccs = list(nx.strongly_connected_components(G_nx))
-if not sccs:
-    raise ValueError("O grafo não possui componentes fortemente conexos.")
-largest_scc_nodes = max(sccs, key=len)
-H = G_nx.subgraph(largest_scc_nodes).copy()
-
-
-strong_bridges = StrongBridges(H)
-
-#Excluindo rotatórias
-roundabout_edges = set()
-
-for u, v, k, data in G_nx.edges(keys=True, data=True):
-    if data.get("junction") == "roundabout":
-        roundabout_edges.add((u, v))
+    return carregar_grafo(coords, custom_filter)
 
-filtered_strong_bridges = []
-for (u, v) in strong_bridges:
-
-    if (u, v) in roundabout_edges:
-        continue
-    filtered_strong_bridges.append((u, v))
-
-strong_bridges = filtered_strong_bridges
-
-
-
-# Converter NetworkX p igraph
-nx_nodes = list(G_nx.nodes())
-node_id_map = {node: idx for idx, node in enumerate(nx_nodes)}
-edges_ig = [(node_id_map[u], node_id_map[v]) for u, v in G_nx.edges()]
-G = ig.Graph(edges_ig, directed=True)
-
-
-# Mapear strong_bridges para índices de arestas do igraph
-critical_edges = []
-for (u, v) in strong_bridges:
-    
-    if u not in node_id_map or v not in node_id_map:
-        continue
-    ui, vi = node_id_map[u], node_id_map[v]
-    try:
-        eid = G.get_eid(ui, vi)
-        critical_edges.append(eid)
-    except ig._igraph.InternalError:
-        # aresta não existe no grafo global, ignora
-        continue
-
-critical_edges = list(set(critical_edges))
-
-# Posições para plot
-pos = {node_id_map[n]: (G_nx.nodes[n]["y"], -G_nx.nodes[n]["x"]) for n in G_nx.nodes()}
 
+# -------------------
+# Conectividade forte: pontes e pontos de articulação fortes
+# -------------------
+def _idom(dominators):
+    # igraph devolve -1 para a raiz e nan para vértices inalcançáveis
+    idom = np.array(dominators, dtype=float)
+    return np.where(np.isnan(idom), -2, idom).astype(np.int64)
 
-# Mapear de volta para índices do igraph
-edge_map = {(e.source, e.target): e.index for e in G.es}
 
+def strong_connectivity(G):
+    """
+    Pontes fortes e pontos de articulação fortes de todas as componentes
+    fortemente conexas não triviais (Italiano, Laura e Santaroni), em tempo
+    linear sobre o grafo inteiro.
+
+    Cada aresta interna a uma componente é subdividida por um vértice
+    intermediário e uma raiz virtual S liga-se (nos dois sentidos) a uma raiz
+    por componente. Basta então uma árvore de dominadores (Lengauer–Tarjan,
+    igraph) com mode="out" e outra com mode="in" a partir de S: a aresta e
+    é ponte forte se o seu vértice intermediário domina a ponta de chegada no
+    grafo ou a de saída no reverso.
+    """
+    n = G.vcount()
+    edges = np.array(G.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    membership = np.array(G.connected_components(mode="strong").membership, dtype=np.int64)
+    sizes = np.bincount(membership, minlength=1)
+
+    src, dst = edges[:, 0], edges[:, 1]
+    internal = np.flatnonzero((membership[src] == membership[dst]) & (src != dst))
+    components = np.flatnonzero(sizes > 1)
+
+    # raiz de cada componente não trivial: o seu vértice de menor índice
+    first = np.full(len(sizes), n, dtype=np.int64)
+    np.minimum.at(first, membership, np.arange(n))
+    roots = first[components]
+
+    m = len(internal)
+    mid = n + np.arange(m)
+    S = n + m
+    H = ig.Graph(n=S + 1, directed=True, edges=np.concatenate((
+        np.column_stack((src[internal], mid)),
+        np.column_stack((mid, dst[internal])),
+        np.column_stack((np.full(len(roots), S), roots)),
+        np.column_stack((roots, np.full(len(roots), S))),
+    )).tolist())
+    idom_out = _idom(H.dominator(S, mode="out"))
+    idom_in = _idom(H.dominator(S, mode="in"))
+
+    bridges = internal[(idom_out[dst[internal]] == mid) | (idom_in[src[internal]] == mid)]
+
+    # pontos de articulação: dominadores não triviais (fora a raiz) em qualquer sentido...
+    inside = np.flatnonzero(sizes[membership] > 1)
+    inside = inside[~np.isin(inside, roots)]
+    candidates = []
+    for idom in (idom_out, idom_in):
+        d = idom[inside]
+        d = np.where((d >= n) & (d < S), idom[np.clip(d, 0, S)], d)  # sobe do intermediário à ponta original
+        candidates.append(d[d < n])
+    points = np.setdiff1d(np.concatenate(candidates), roots)
+
+    # ... e a raiz, se a componente sem ela deixa de ser fortemente conexa
+    keep = internal[~np.isin(src[internal], roots) & ~np.isin(dst[internal], roots)]
+    rest = ig.Graph(n=n, edges=edges[keep].tolist(), directed=True)
+    labels = np.array(rest.connected_components(mode="strong").membership, dtype=np.int64)
+    pairs = np.unique(np.column_stack((membership[inside], labels[inside])), axis=0)
+    split = np.bincount(pairs[:, 0], minlength=len(sizes)) > 1
+    points = np.union1d(points, roots[split[components]])
+
+    return {
+        "membership": membership,
+        "roots": roots,
+        "internal": internal,
+        "idom_out": idom_out,
+        "idom_in": idom_in,
+        "bridges": bridges,
+        "articulation_points": points,
+    }
 
 
-# Plot
-fig = go.Figure()
+# -------------------
+# Impacto das pontes fortes
+# -------------------
+class _Subarvores:
+    """Pré-ordem da árvore de dominadores: a subárvore de x é order[tin[x]:tin[x] + size[x]]."""
+
+    def __init__(self, idom, root, n):
+        N = len(idom)
+        child = np.flatnonzero(idom >= 0)
+        T = ig.Graph(n=N, edges=np.column_stack((idom[child], child)).tolist(), directed=True)
+        self.order = np.array(T.dfs(root)[0], dtype=np.int64)
+        self.tin = np.full(N, -1, dtype=np.int64)
+        self.tin[self.order] = np.arange(len(self.order))
+
+        size = [1] * N
+        parent = idom.tolist()
+        for v in reversed(self.order[1:].tolist()):
+            size[parent[v]] += size[v]
+        self.size = np.array(size, dtype=np.int64)
+        # vértices originais (< n) acumulados na pré-ordem: contagem da subárvore em O(1)
+        self.originals = np.concatenate(([0], np.cumsum(self.order < n)))
+        self.n = n
+
+    def count(self, x):
+        return self.originals[self.tin[x] + self.size[x]] - self.originals[self.tin[x]]
+
+    def members(self, x):
+        sub = self.order[self.tin[x]:self.tin[x] + self.size[x]]
+        return sub[sub < self.n]
+
+
+_worker_csr = None
+
+def _init_worker(n, edges):
+    global _worker_csr
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    _worker_csr = csr_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])), shape=(n, n))
+
+def _affected_sccs(task):
+    # componentes fortemente conexas dentro do conjunto afetado A, sem a ponte (u, v)
+    u, v, A = task
+    sub = _worker_csr[A][:, A].tocoo()
+    pos = np.searchsorted(A, (u, v))
+    keep = np.ones(sub.nnz, dtype=bool)
+    if np.all(pos < len(A)) and np.all(A[np.minimum(pos, len(A) - 1)] == (u, v)):
+        keep = (sub.row != pos[0]) | (sub.col != pos[1])
+    sub = csr_matrix((sub.data[keep], (sub.row[keep], sub.col[keep])), shape=sub.shape)
+    _, labels = connected_components(sub, directed=True, connection="strong")
+    return int((np.bincount(labels).astype(np.int64) ** 2).sum())
+
+
+def strong_bridge_impact(G, conectividade, n_workers=1):
+    """
+    Pares ordenados de vértices que perdem alcançabilidade mútua com a
+    remoção de cada ponte forte e = (u, v) da componente C.
 
-# --- Arestas normais ---
-edge_x, edge_y = [], []
-for e in G.es:
-    if e.index in critical_edges:
-        continue
-    u, v = e.tuple
-    x0, y0 = pos[u]
-    x1, y1 = pos[v]
-    edge_x += [x0, x1, None]
-    edge_y += [y0, y1, None]
+    Com x o vértice intermediário de e, D(x) (subárvore na árvore de
+    dominadores do grafo) são os vértices que deixam de ser alcançados pela
+    raiz e D^R(x) (no reverso) os que deixam de alcançá-la. Fora de
+    A = D(x) ∪ D^R(x) a componente continua inteira, então
 
-fig.add_trace(go.Scatter(
-    x=edge_x, y=edge_y,
-    mode='lines',
-    line=dict(width=1, color='gray'),
-    hoverinfo='none'
-))
+        perdidos = |C|² − (|C| − |A|)² − Σ s_i²
 
-# --- Arestas críticas ---
-edge_x, edge_y = [], []
-for e in G.es:
-    if e.index not in critical_edges:
-        continue
-    u, v = e.tuple
-    x0, y0 = pos[u]
-    x1, y1 = pos[v]
-    edge_x += [x0, x1, None]
-    edge_y += [y0, y1, None]
-
-fig.add_trace(go.Scatter(
-    x=edge_x, y=edge_y,
-    mode='lines',
-    line=dict(width=2, color='red'),
-    hoverinfo='none',
-    name='Arestas críticas'
-))
-
-# --- Todos os vértices mesma cor ---
-node_x = [pos[i][0] for i in range(len(nx_nodes))]
-node_y = [pos[i][1] for i in range(len(nx_nodes))]
-
-fig.add_trace(go.Scatter(
-    x=node_x, y=node_y,
-    mode='markers',
-    marker=dict(size=4, color='lightblue'),
-    name="Nós"
-))
-
-fig.update_layout(
-    title="Arestas Críticas (Strong Bridges)",
-    showlegend=True,
-    margin=dict(l=0, r=0, t=40, b=0),
-    hovermode="closest",
-    xaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False),
-    yaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False)
-)
-fig.update_yaxes(scaleanchor="x", scaleratio=1)
-fig.show()
\ No newline at end of file
+    onde s_i são as componentes formadas dentro de A. Quando |A| <= 1 isso
+    sai só do tamanho das subárvores; nos demais casos as componentes são
+    recalculadas apenas sobre A, em paralelo (n_workers=None usa todos os núcleos).
+    """
+    n = G.vcount()
+    edges = np.array(G.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    membership = conectividade["membership"]
+    bridges = conectividade["bridges"]
+    idom_out, idom_in = conectividade["idom_out"], conectividade["idom_in"]
+    S = len(idom_out) - 1
+
+    out = _Subarvores(idom_out, S, n)
+    rev = _Subarvores(idom_in, S, n)
+    mid = n + np.searchsorted(conectividade["internal"], bridges)
+    d_out = out.count(mid)
+    d_in = rev.count(mid)
+
+    component = np.bincount(membership)[membership[edges[bridges, 0]]]
+    affected = d_out + d_in
+    sum_sq = affected.copy()
+
+    pending = np.flatnonzero(affected > 1)
+    tasks = []
+    for i in pending:
+        A = np.union1d(out.members(mid[i]), rev.members(mid[i]))
+        affected[i] = len(A)
+        u, v = edges[bridges[i]]
+        tasks.append((u, v, A))
+
+    sum_sq[pending] = list(mapa_paralelo(_affected_sccs, tasks, _init_worker, carga_grafo(G), n_workers))
+
+    lost = component ** 2 - (component - affected) ** 2 - sum_sq
+    return {
+        "bridges": bridges,
+        "component_size": component,
+        "affected": affected,
+        "lost_pairs": lost,
+    }
+
+
+def tabela_impacto(grafo, impacto):
+    """Pontes fortes ordenadas pelo número de pares que perdem alcançabilidade mútua."""
+    e = impacto["bridges"]
+    tabela = pd.DataFrame({
+        "aresta": e,
+        "osmid_u": grafo.osmid[grafo.src[e]],
+        "osmid_v": grafo.osmid[grafo.dst[e]],
+        "highway": grafo.highway()[e],
+        "length": grafo.length[e],
+        "rotatoria": grafo.junction()[e] == "roundabout",
+        "tamanho_componente": impacto["component_size"],
+        "vertices_afetados": impacto["affected"],
+        "pares_perdidos": impacto["lost_pairs"],
+    })
+    tabela = tabela.sort_values("pares_perdidos", ascending=False, kind="stable").reset_index(drop=True)
+    tabela.insert(0, "rank", np.arange(1, len(tabela) + 1))
+    return tabela
+
+
+def projetar_impacto(contraido, impacto):
+    """
+    Impacto calculado na malha contraída -> arestas do grafo completo: cada
+    super-aresta crítica vira todas as arestas originais da sua cadeia, com o
+    mesmo impacto (fechar qualquer trecho da cadeia fecha a via inteira).
+    Os pares são contados entre cruzamentos.
+    """
+    bridges = np.asarray(impacto["bridges"], dtype=np.int64)
+    tamanhos = contraido.aresta_ptr[bridges + 1] - contraido.aresta_ptr[bridges]
+    projetado = {"bridges": contraido.arestas_originais(bridges)}
+    for chave in ("component_size", "affected", "lost_pairs"):
+        projetado[chave] = np.repeat(np.asarray(impacto[chave]), tamanhos)
+    return projetado
+
+
+if __name__ == "__main__":
+    grafo, graph_key = iniciarGrafo()
+
+    # análise na malha com as cadeias de grau 2 contraídas; pontes e pontos de
+    # articulação voltam para o grafo completo antes da tabela e do mapa
+    CONTRAIR = True
+    if CONTRAIR:
+        contraido, analise_key = carregar_contraido(grafo, graph_key)
+        G = contraido.igraph()
+    else:
+        analise_key = graph_key
+        G = grafo.igraph()
+
+    conectividade = strong_connectivity(G)
+    articulation_points = conectividade["articulation_points"]
+    if CONTRAIR:
+        articulation_points = contraido.keep[np.asarray(articulation_points, dtype=np.int64)]
+
+    def calcular_impacto():
+        impacto = strong_bridge_impact(G, conectividade, n_workers=None)
+        return tabela_impacto(grafo, projetar_impacto(contraido, impacto) if CONTRAIR else impacto)
+
+    tabela, _ = cached(
+        "strong_bridge_impact", {}, [analise_key], calcular_impacto,
+        ext=".csv", save=lambda df, path: df.to_csv(path, index=False), load=pd.read_csv,
+        label="impacto das pontes fortes")
+    print(f"{len(tabela)} pontes fortes e {len(articulation_points)} pontos de articulação fortes.")
+    print(tabela.head(10).to_string(index=False))
+
+    #Excluindo rotatórias
+    tabela = tabela[~tabela["rotatoria"]]
+
+    # máscara por aresta em vez de busca numa lista para cada aresta do grafo
+    critical = np.zeros(grafo.m, dtype=bool)
+    critical[tabela["aresta"].to_numpy()] = True
+
+    # Posições para plot (coordenadas geográficas, rotacionadas)
+    px, py = posicoes(grafo, projected=False)
+
+    # Plot
+    fig = figura_mapa("Arestas Críticas (Strong Bridges)", showlegend=True)
+
+    # --- Arestas normais ---
+    src, dst = arestas_unicas(grafo.src[~critical], grafo.dst[~critical])
+    camada_arestas(fig, px, py, src, dst, niveis=3, line=dict(width=1, color='gray'), showlegend=False)
+
+    # --- Arestas críticas, coloridas por faixa de impacto (quantis de pares perdidos) ---
+    n_faixas = 5
+    impacto = tabela["pares_perdidos"].to_numpy()
+    faixa = np.zeros(len(tabela), dtype=int)
+    if len(tabela):
+        limites = np.unique(np.quantile(impacto, np.linspace(0, 1, n_faixas + 1)[1:-1]))
+        faixa = np.searchsorted(limites, impacto, side="right")
+    cores = sample_colorscale("YlOrRd", np.linspace(0.35, 1, n_faixas))
+
+    for f in range(n_faixas):
+        arestas = tabela["aresta"].to_numpy()[faixa == f]
+        if not len(arestas):
+            continue
+        sel = impacto[faixa == f]
+        camada_arestas(fig, px, py, grafo.src[arestas], grafo.dst[arestas],
+                       line=dict(width=2, color=cores[f]),
+                       name=f'Arestas críticas ({sel.min():,}–{sel.max():,} pares)')
+
+    # --- Todos os vértices mesma cor ---
+    fig.add_trace(go.Scattergl(
+        x=px.astype(np.float32), y=py.astype(np.float32),
+        mode='markers',
+        marker=dict(size=4, color='lightblue'),
+        name="Nós"
+    ))
+
+    # --- Pontos de articulação fortes ---
+    fig.add_trace(go.Scattergl(
+        x=px[articulation_points].astype(np.float32),
+        y=py[articulation_points].astype(np.float32),
+        mode='markers',
+        marker=dict(size=6, color='orange'),
+        name="Pontos de articulação fortes"
+    ))
+
+    salvar_html(fig, "mapa_arestas_criticas.html")
@@ -1,14 +1,16 @@
-import networkx as nx
-import osmnx as ox
+import numpy as np
+import igraph as ig
 import plotly.graph_objects as go
 from shapely.geometry import Polygon
 import os
-import pickle
-from networkx.algorithms.community import girvan_newman
+import random
+from tqdm import tqdm
+from cache import CACHE_DIR, cached
+from grafo import carregar_contraido, carregar_grafo
+from renderizacao import arestas_unicas, camada_arestas, figura_mapa, posicoes, salvar_html
 
 
 
-CACHE_DIR = "dados_cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 # Polígono de Palmas
@@ -37,107 +39,170 @@ custom_filter = (
 )
 
 
-def save_pickle(obj, filename):
-    with open(filename, "wb") as f:
-        pickle.dump(obj, f)
-
-def load_pickle(filename):
-    with open(filename, "rb") as f:
-        return pickle.load(f)
-
 #Carregar / gerar grafo
 def iniciarGrafo():
-    graph_path = os.path.join(CACHE_DIR, "grafo.graphml")
-
-    if os.path.exists(graph_path):
-        print("Carregando grafo do cache...")
-        G = ox.load_graphml(graph_path)
-    else:
-        print("Gerando grafo a partir do polígono...")
-        G = ox.graph_from_polygon(poly, custom_filter=custom_filter, network_type='drive')
-        ox.save_graphml(G, graph_path)
-        print("Grafo salvo em cache.")
-
-    return G 
-
-G = iniciarGrafo()
-
-
-gn_cache = os.path.join(CACHE_DIR, "girvan_newman_partition.pkl")
-
-if os.path.exists(gn_cache):
-    print("Carregando clusters Girvan-Newman do cache...")
-    partition = load_pickle(gn_cache)
-else:
-    print("Aplicando o algoritmo de Girvan-Newman...")
-    comp = girvan_newman(G)
-    limited = next(comp) 
-
-    partition = {}
-    for i, community in enumerate(limited):
-        for node in community:
-            partition[node] = i
-
-    save_pickle(partition, gn_cache)
-    print("Resultado Girvan-Newman salvo.")
-
-
-print("Projetando grafo para UTM e rotacionando 90°...")
-G_proj = ox.project_graph(G)
-G_proj = nx.Graph(G_proj) 
-
-pos = {}
-for n in G_proj.nodes():
-    x = G_proj.nodes[n]["x"]
-    y = G_proj.nodes[n]["y"]
-    pos[n] = (y, -x)  
-
-
-node_x, node_y, node_color = [], [], []
-for node in G_proj.nodes():
-    x, y = pos[node]
-    node_x.append(x)
-    node_y.append(y)
-    node_color.append(partition.get(node, -1)) 
-
-
-node_trace = go.Scatter(
-    x=node_x, y=node_y,
-    mode='markers',
-    marker=dict(
-        size=4,
-        color=node_color,
-        colorscale='Viridis',
-        line=dict(width=1)
-    ),
-    hoverinfo='text'
-)
-
-
-edge_x, edge_y = [], []
-for u, v in G_proj.edges():
-    x0, y0 = pos[u]
-    x1, y1 = pos[v]
-    edge_x += [x0, x1, None]
-    edge_y += [y0, y1, None]
-
-edge_trace = go.Scatter(
-    x=edge_x, y=edge_y,
-    line=dict(width=2, color='DarkSlateGrey'),
-    hoverinfo='none',
-    mode='lines'
-)
-
-
-fig = go.Figure(data=[edge_trace, node_trace])
-fig.update_layout(
-    title='Grafo com clusters Girvan-Newman',
-    showlegend=False,
-    hovermode='closest',
-    margin=dict(b=20, l=5, r=5, t=40),
-    xaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False),
-    yaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False)
-)
-fig.update_yaxes(scaleanchor="x", scaleratio=1)  
-
-fig.show()
+    return carregar_grafo(coords, custom_filter)
+
+
+#Girvan–Newman
+def dendrograma_girvan_newman(n, src, dst, n_samples=None, seed=None):
+    """
+    Dendrograma completo de Girvan–Newman no grafo não direcionado simples
+    (arestas src[i]–dst[i], vértices 0..n-1).
+
+    A cada passo sai a aresta de maior betweenness; a betweenness só é
+    recalculada dentro da componente que continha a aresta removida. Com
+    n_samples, ela é estimada a partir de até n_samples fontes sorteadas por
+    componente (escalada pelo tamanho da componente).
+
+    O histórico fica como num dendrograma aglomerativo: cada divisão cria o
+    rótulo novo c0, c0+1, ... com parent[novo] = rótulo dividido, e labels
+    guarda o rótulo final de cada vértice. modularity[K] é a modularidade da
+    partição em K comunidades.
+    """
+    rng = random.Random(seed)
+    m = len(src)
+    alive = np.ones(m, dtype=bool)
+    deg = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+
+    G = ig.Graph(n=n, edges=np.column_stack((src, dst)).tolist())
+    labels = np.array(G.connected_components().membership, dtype=np.int64)
+    c0 = int(labels.max()) + 1 if n else 0
+
+    # modularidade: Q = Σ_c L_c/m − (D_c/2m)², mantida por comunidade
+    internal = np.zeros(n, dtype=np.int64)
+    volume = np.zeros(n, dtype=np.int64)
+    np.add.at(internal, labels[src], 1)
+    np.add.at(volume, labels, deg)
+
+    def termo(c):
+        return internal[c] / m - (volume[c] / (2 * m)) ** 2 if m else 0.0
+
+    Q = sum(termo(c) for c in range(c0))
+    modularity = np.full(n + 1, np.nan)
+    modularity[c0] = Q
+
+    def betweenness(H):
+        if n_samples is None or n_samples >= H.vcount():
+            return np.array(H.edge_betweenness(directed=False))
+        sources = rng.sample(range(H.vcount()), n_samples)
+        return np.array(H.edge_betweenness(directed=False, sources=sources)) * H.vcount() / n_samples
+
+    eb = np.full(m, -1.0)
+    eb[:] = betweenness(G)
+
+    parent = np.arange(n, dtype=np.int64)
+    removal_order = np.empty(m, dtype=np.int64)
+    split_step = np.full(n, -1, dtype=np.int64)
+    next_label = c0
+
+    for step in tqdm(range(m), desc="Girvan–Newman", unit="arestas"):
+        e = int(np.argmax(eb))
+        removal_order[step] = e
+        alive[e] = False
+        eb[e] = -1.0
+
+        # só a componente que continha a aresta é afetada
+        c = labels[src[e]]
+        verts = np.flatnonzero(labels == c)
+        E = np.flatnonzero(alive & (labels[src] == c))
+        local = np.empty(n, dtype=np.int64)
+        local[verts] = np.arange(len(verts))
+        H = ig.Graph(n=len(verts), edges=np.column_stack((local[src[E]], local[dst[E]])).tolist())
+
+        pieces = np.array(H.connected_components().membership)
+        if pieces.max() > 0:
+            # a remoção dividiu a componente: o pedaço 1 ganha rótulo novo
+            new = next_label
+            next_label += 1
+            parent[new] = c
+            split_step[new] = step
+            Q -= termo(c)
+            labels[verts[pieces == 1]] = new
+            for lab in (c, new):
+                mask = labels[src] == lab
+                internal[lab] = np.count_nonzero(mask & (labels[dst] == lab))
+                volume[lab] = deg[labels == lab].sum()
+            Q += termo(c) + termo(new)
+            modularity[next_label] = Q
+
+        if len(E):
+            eb[E] = betweenness(H)
+
+    return {
+        "n_initial": c0,
+        "labels": labels,
+        "parent": parent,
+        "split_step": split_step,
+        "removal_order": removal_order,
+        "modularity": modularity,
+    }
+
+
+def cortar_dendrograma(dendrograma, n_comunidades=None):
+    """
+    Partição com n_comunidades comunidades (ou a de modularidade máxima),
+    desfazendo as divisões posteriores; nada é recalculado.
+    """
+    modularity = dendrograma["modularity"]
+    if n_comunidades is None:
+        n_comunidades = int(np.nanargmax(modularity))
+    n_comunidades = min(max(n_comunidades, dendrograma["n_initial"]), len(modularity) - 1)
+
+    labels = dendrograma["labels"].copy()
+    parent = dendrograma["parent"]
+    while True:
+        late = labels >= n_comunidades
+        if not late.any():
+            return labels
+        labels[late] = parent[labels[late]]
+
+
+if __name__ == "__main__":
+    grafo, graph_key = iniciarGrafo()
+
+    # None: corte na modularidade máxima; um inteiro fixa o número de comunidades
+    N_COMUNIDADES = None
+    # None: betweenness exata; um inteiro estima com essa quantidade de fontes por componente
+    N_SAMPLES = None
+    SEED = 42
+    CONTRAIR = True  # malha contraída e projeção de volta: ver grafo.contrair
+    analise, analise_key = carregar_contraido(grafo, graph_key) if CONTRAIR else (grafo, graph_key)
+
+    def aplicar_girvan_newman():
+        print("Aplicando o algoritmo de Girvan-Newman...")
+        src, dst = arestas_unicas(analise.src, analise.dst)
+        return dendrograma_girvan_newman(analise.n, src, dst, N_SAMPLES, SEED)
+
+    dendrograma, _ = cached("girvan_newman_dendrogram", {"samples": N_SAMPLES, "seed": SEED},
+                            [analise_key], aplicar_girvan_newman,
+                            label="dendrograma Girvan-Newman")
+
+    membership = cortar_dendrograma(dendrograma, N_COMUNIDADES)
+    n_comunidades = int(membership.max()) + 1
+    print(f"{n_comunidades} comunidades (modularidade {dendrograma['modularity'][n_comunidades]:.4f}).")
+
+    print("Usando coordenadas projetadas (UTM) e rotacionando 90°...")
+    px, py = posicoes(grafo, projected=True)
+
+    node_color = analise.projetar_vertices(membership) if CONTRAIR else membership
+
+
+    fig = figura_mapa('Grafo com clusters Girvan-Newman')
+
+    src, dst = arestas_unicas(grafo.src, grafo.dst)
+    camada_arestas(fig, px, py, src, dst, niveis=3, line=dict(width=2, color='DarkSlateGrey'))
+
+    fig.add_trace(go.Scattergl(
+        x=px.astype(np.float32), y=py.astype(np.float32),
+        mode='markers',
+        marker=dict(
+            size=4,
+            color=node_color,
+            colorscale='Viridis',
+            line=dict(width=1)
+        ),
+        hoverinfo='text'
+    ))
+
+    salvar_html(fig, "mapa_girvan_newman.html")
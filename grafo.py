@@ -0,0 +1,381 @@
+"""
+Carregador compartilhado da malha viária.
+
+O GraphML baixado do OSM é convertido uma única vez para um diretório de
+arrays NumPy (adjacência CSR, coordenadas geográficas e projetadas dos nós,
+colunas de comprimento/junction/highway das arestas e índice de ids OSM).
+Nas execuções seguintes os arrays são abertos por memory-map, sem parsing;
+as visões iGraph e NetworkX só são montadas quando algum script pede.
+
+contrair() junta as cadeias de vértices de grau 2 (pontos de forma das
+vias curvas) em super-arestas com o comprimento somado; GrafoContraido
+guarda o mapeamento nos dois sentidos para projetar resultados de volta.
+"""
+import igraph as ig
+import networkx as nx
+import numpy as np
+import osmnx as ox
+from scipy.sparse import csr_matrix
+from shapely.geometry import Polygon
+
+from cache import artifact_key, cached, file_key, load_arrays, save_arrays
+
+FORMAT_VERSION = 1
+
+
+class GrafoBinario:
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self._igraph = None
+        self._networkx = {}
+
+    def __getattr__(self, name):
+        arrays = self.__dict__.get("arrays", {})
+        if name in arrays:
+            return arrays[name]
+        raise AttributeError(name)
+
+    @property
+    def n(self):
+        return self.meta["n"]
+
+    @property
+    def m(self):
+        return self.meta["m"]
+
+    # Persistência
+
+    def salvar(self, path):
+        save_arrays(path, self.arrays, self.meta)
+
+    @classmethod
+    def abrir(cls, path):
+        return cls(*load_arrays(path))
+
+    # Índices
+
+    def indice(self, osmids):
+        """Índice interno (0..n-1) de um id OSM ou array de ids OSM."""
+        if not len(self.osmid_sorted):
+            raise KeyError(f"Id OSM fora do grafo: {osmids}")
+        # ids maiores que todos caem em len(ids); o recorte os leva à última
+        # posição, onde a comparação abaixo os rejeita
+        busca = np.searchsorted(self.osmid_sorted, osmids)
+        pos = self.osmid_order[np.minimum(busca, len(self.osmid_sorted) - 1)]
+        encontrado = self.osmid[pos] == osmids
+        if not np.all(encontrado):
+            raise KeyError(f"Id OSM fora do grafo: {np.asarray(osmids)[~encontrado] if np.ndim(osmids) else osmids}")
+        return pos
+
+    def highway(self):
+        return np.asarray(self.meta["highway_vocab"], dtype=object)[self.highway_code]
+
+    def junction(self):
+        return np.asarray(self.meta["junction_vocab"], dtype=object)[self.junction_code]
+
+    # Visões
+
+    def csr(self):
+        data = np.ones(self.m, dtype=np.int8)
+        return csr_matrix((data, np.asarray(self.dst), np.asarray(self.indptr)), shape=(self.n, self.n))
+
+    def igraph(self):
+        if self._igraph is None:
+            G = ig.Graph(n=self.n, edges=np.column_stack((self.src, self.dst)).tolist(), directed=True)
+            G.vs["id"] = self.osmid.tolist()
+            G.vs["x"] = self.x.tolist()
+            G.vs["y"] = self.y.tolist()
+            G.es["weight"] = self.length.tolist()
+            self._igraph = G
+        return self._igraph
+
+    def networkx(self, projected=False):
+        """MultiDiGraph no formato do OSMnx (nós = ids OSM), geográfico ou projetado."""
+        if projected not in self._networkx:
+            x, y = (self.x_proj, self.y_proj) if projected else (self.x, self.y)
+            G = nx.MultiDiGraph(crs=self.meta["crs_proj" if projected else "crs"])
+            osmid = self.osmid.tolist()
+            G.add_nodes_from((osmid[i], {"x": float(x[i]), "y": float(y[i])}) for i in range(self.n))
+
+            highway = self.highway()
+            junction = self.junction()
+            for e in range(self.m):
+                data = {"length": float(self.length[e]), "highway": highway[e],
+                        "oneway": bool(self.oneway[e])}
+                if junction[e]:
+                    data["junction"] = junction[e]
+                G.add_edge(osmid[self.src[e]], osmid[self.dst[e]], key=int(self.key[e]), **data)
+            self._networkx[projected] = G
+        return self._networkx[projected]
+
+
+class GrafoContraido(GrafoBinario):
+    """
+    Malha sem os vértices interiores das cadeias de grau 2. Além dos arrays
+    do GrafoBinario (só dos vértices mantidos e das super-arestas):
+      keep: índice original de cada vértice mantido
+      novo: índice contraído de cada vértice original (-1 nos interiores)
+      proximo: vértice mantido mais perto (ao longo da cadeia) de cada vértice original
+      super_aresta: super-aresta de cada aresta original
+      aresta_ptr/aresta_orig: arestas originais de cada super-aresta, em ordem (CSR)
+      interior_ptr/interior_orig: vértices interiores de cada super-aresta, em ordem (CSR)
+    """
+
+    @property
+    def key(self):
+        """Chave de cada super-aresta na visão NetworkX: 0, 1, ... entre cadeias paralelas."""
+        if not self.m:
+            return np.empty(0, dtype=np.int64)
+        par = np.asarray(self.src, dtype=np.int64) * self.n + np.asarray(self.dst)
+        ordem = np.argsort(par, kind="stable")
+        inicio = np.flatnonzero(np.concatenate(([True], par[ordem][1:] != par[ordem][:-1])))
+        chave = np.empty(self.m, dtype=np.int64)
+        chave[ordem] = np.arange(self.m) - np.repeat(inicio, np.diff(np.append(inicio, self.m)))
+        return chave
+
+    def arestas_originais(self, arestas):
+        """Arestas originais das super-arestas dadas, concatenadas."""
+        arestas = np.atleast_1d(arestas)
+        if not len(arestas):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.aresta_orig[self.aresta_ptr[e]:self.aresta_ptr[e + 1]] for e in arestas])
+
+    def projetar_arestas(self, valores):
+        """Valor por super-aresta -> valor por aresta original."""
+        return np.asarray(valores)[self.super_aresta]
+
+    def projetar_vertices(self, valores):
+        """
+        Valor por vértice mantido -> valor por vértice original; cada vértice
+        interior herda o valor da ponta mais próxima da sua cadeia.
+        """
+        return np.asarray(valores)[self.proximo]
+
+    def selecao_contraida(self, vertices):
+        """
+        Vértices originais removidos -> (vértices mantidos removidos,
+        super-arestas removidas): cai toda super-aresta com algum vértice
+        interior da sua cadeia entre os removidos.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        novos = self.novo[vertices]
+        dono = np.repeat(np.arange(len(self.interior_ptr) - 1), np.diff(self.interior_ptr))
+        arestas = np.unique(dono[np.isin(self.interior_orig, vertices)])
+        return novos[novos >= 0], arestas
+
+
+def _contraivel(grafo):
+    # v é interior de uma cadeia se liga exatamente dois vizinhos u != w, só
+    # num sentido (u -> v -> w) ou nos dois (u <-> v <-> w), sem laços nem paralelas
+    src, dst, indptr = np.asarray(grafo.src), np.asarray(grafo.dst), np.asarray(grafo.indptr)
+    by_dst = np.argsort(dst, kind="stable")
+    in_ptr = np.concatenate(([0], np.cumsum(np.bincount(dst, minlength=grafo.n))))
+    contraivel = np.zeros(grafo.n, dtype=bool)
+    for v in range(grafo.n):
+        succ = dst[indptr[v]:indptr[v + 1]].tolist()
+        pred = src[by_dst[in_ptr[v]:in_ptr[v + 1]]].tolist()
+        if v in succ or v in pred:
+            continue
+        if len(succ) == 1 and len(pred) == 1:
+            contraivel[v] = succ[0] != pred[0]
+        elif len(succ) == 2 and len(pred) == 2:
+            contraivel[v] = succ[0] != succ[1] and sorted(succ) == sorted(pred)
+    return contraivel
+
+def _cadeias(grafo, mantido):
+    # percorre, a partir de cada aresta que sai de um vértice mantido, a cadeia até o próximo mantido
+    dst, indptr = np.asarray(grafo.dst), np.asarray(grafo.indptr)
+    cadeias = []
+    for a in np.flatnonzero(mantido):
+        for e in range(indptr[a], indptr[a + 1]):
+            arestas, interiores = [e], []
+            anterior, b = a, dst[e]
+            while not mantido[b]:
+                interiores.append(b)
+                # a aresta de saída que não volta para trás (na cadeia de mão única, a única)
+                saidas = range(indptr[b], indptr[b + 1])
+                e = next(x for x in saidas if dst[x] != anterior or len(saidas) == 1)
+                arestas.append(e)
+                anterior, b = b, dst[e]
+            cadeias.append((a, b, arestas, interiores))
+    return cadeias
+
+def contrair(grafo):
+    """
+    Contrai as cadeias de vértices de grau 2 de um GrafoBinario.
+
+    Os scripts com CONTRAIR = True (louvain, girwan_newman, conexoTcc)
+    analisam a malha contraída e levam o resultado de volta ao grafo
+    completo: projetar_vertices dá a cada vértice interior o valor (a
+    comunidade, por exemplo) da ponta mais próxima da sua cadeia, e
+    projetar_arestas o da super-aresta a cada trecho original.
+    """
+    mantido = ~_contraivel(grafo)
+    while True:
+        cadeias = _cadeias(grafo, mantido)
+        visitados = np.zeros(grafo.n, dtype=bool)
+        for _, _, _, interiores in cadeias:
+            visitados[interiores] = True
+        # cadeias que voltam ao ponto de partida virariam laços e sairiam da componente
+        # fortemente conexa: o vértice do meio fica
+        lacos = [interiores[len(interiores) // 2] for a, b, _, interiores in cadeias if a == b and interiores]
+        # ciclos só de vértices de grau 2 (uma quadra isolada): um vértice de cada fica
+        soltos = np.flatnonzero(~mantido & ~visitados)
+        if not lacos and not len(soltos):
+            break
+        mantido[lacos] = True
+        if len(soltos):
+            mantido[soltos[0]] = True
+
+    keep = np.flatnonzero(mantido).astype(np.int64)
+    novo = np.full(grafo.n, -1, dtype=np.int64)
+    novo[keep] = np.arange(len(keep))
+    length = np.asarray(grafo.length)
+
+    # super-arestas em ordem de origem: a posição é a posição na CSR, como no GrafoBinario
+    cadeias.sort(key=lambda c: novo[c[0]])
+    src = np.array([novo[a] for a, _, _, _ in cadeias], dtype=np.int32)
+    dst = np.array([novo[b] for _, b, _, _ in cadeias], dtype=np.int32)
+    aresta_orig = np.concatenate([c[2] for c in cadeias]).astype(np.int64) if cadeias else np.empty(0, np.int64)
+    aresta_ptr = np.concatenate(([0], np.cumsum([len(c[2]) for c in cadeias]))).astype(np.int64)
+    interior_orig = np.array([v for c in cadeias for v in c[3]], dtype=np.int64)
+    interior_ptr = np.concatenate(([0], np.cumsum([len(c[3]) for c in cadeias]))).astype(np.int64)
+    super_aresta = np.empty(grafo.m, dtype=np.int64)
+    super_aresta[aresta_orig] = np.repeat(np.arange(len(cadeias)), np.diff(aresta_ptr))
+
+    # vértice interior -> ponta mais próxima da cadeia (pelo comprimento acumulado)
+    proximo = novo.copy()
+    for i, (a, b, arestas, interiores) in enumerate(cadeias):
+        acumulado = np.cumsum(length[arestas])
+        for v, d in zip(interiores, acumulado[:-1]):
+            proximo[v] = novo[a] if d <= acumulado[-1] / 2 else novo[b]
+
+    osmid = np.asarray(grafo.osmid)[keep]
+    osmid_order = np.argsort(osmid, kind="stable").astype(np.int32)
+    primeira = aresta_orig[aresta_ptr[:-1]]
+    arrays = {
+        "osmid": osmid,
+        "osmid_order": osmid_order,
+        "osmid_sorted": osmid[osmid_order],
+        "x": np.asarray(grafo.x)[keep],
+        "y": np.asarray(grafo.y)[keep],
+        "x_proj": np.asarray(grafo.x_proj)[keep],
+        "y_proj": np.asarray(grafo.y_proj)[keep],
+        "indptr": np.concatenate(([0], np.cumsum(np.bincount(src, minlength=len(keep))))).astype(np.int64),
+        "src": src,
+        "dst": dst,
+        "length": np.add.reduceat(length[aresta_orig], aresta_ptr[:-1]) if cadeias else np.empty(0),
+        # atributos de via da primeira aresta de cada cadeia
+        "oneway": np.asarray(grafo.oneway)[primeira],
+        "highway_code": np.asarray(grafo.highway_code)[primeira],
+        "junction_code": np.asarray(grafo.junction_code)[primeira],
+        "keep": keep,
+        "novo": novo,
+        "proximo": proximo,
+        "super_aresta": super_aresta,
+        "aresta_ptr": aresta_ptr,
+        "aresta_orig": aresta_orig,
+        "interior_ptr": interior_ptr,
+        "interior_orig": interior_orig,
+    }
+    meta = dict(grafo.meta, n=len(keep), m=len(cadeias), n_original=grafo.n, m_original=grafo.m)
+    return GrafoContraido(arrays, meta)
+
+
+# Conversão GraphML -> binário
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "|".join(sorted(str(v) for v in value))
+    return str(value)
+
+def _codes(values):
+    vocab = sorted(set(values))
+    lookup = {v: i for i, v in enumerate(vocab)}
+    return np.array([lookup[v] for v in values], dtype=np.int16), vocab
+
+def converter(G_nx):
+    nodes = list(G_nx.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    G_proj = ox.project_graph(G_nx)
+
+    edges = list(G_nx.edges(keys=True, data=True))
+    src = np.array([index[u] for u, _, _, _ in edges], dtype=np.int32)
+    # arestas em ordem de origem: a posição da aresta é a sua posição na CSR
+    order = np.argsort(src, kind="stable")
+    edges = [edges[i] for i in order]
+    src = src[order]
+    dst = np.array([index[v] for _, v, _, _ in edges], dtype=np.int32)
+
+    highway_code, highway_vocab = _codes([_text(d.get("highway")) for _, _, _, d in edges])
+    junction_code, junction_vocab = _codes([_text(d.get("junction")) for _, _, _, d in edges])
+
+    osmid = np.array(nodes, dtype=np.int64)
+    osmid_order = np.argsort(osmid, kind="stable").astype(np.int32)
+    arrays = {
+        "osmid": osmid,
+        "osmid_order": osmid_order,
+        "osmid_sorted": osmid[osmid_order],
+        "x": np.array([G_nx.nodes[v]["x"] for v in nodes], dtype=np.float64),
+        "y": np.array([G_nx.nodes[v]["y"] for v in nodes], dtype=np.float64),
+        "x_proj": np.array([G_proj.nodes[v]["x"] for v in nodes], dtype=np.float64),
+        "y_proj": np.array([G_proj.nodes[v]["y"] for v in nodes], dtype=np.float64),
+        "indptr": np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n)))).astype(np.int64),
+        "src": src,
+        "dst": dst,
+        "key": np.array([k for _, _, k, _ in edges], dtype=np.int32),
+        "length": np.array([d.get("length", 1.0) for _, _, _, d in edges], dtype=np.float64),
+        "oneway": np.array([bool(d.get("oneway", False)) for _, _, _, d in edges], dtype=bool),
+        "highway_code": highway_code,
+        "junction_code": junction_code,
+    }
+    meta = {
+        "version": FORMAT_VERSION,
+        "n": n,
+        "m": len(edges),
+        "crs": str(G_nx.graph.get("crs", "epsg:4326")),
+        "crs_proj": str(G_proj.graph["crs"]),
+        "highway_vocab": highway_vocab,
+        "junction_vocab": junction_vocab,
+    }
+    return GrafoBinario(arrays, meta)
+
+
+# Carregamento
+
+def carregar_grafo(coords, custom_filter, network_type="drive", graphml_path=None):
+    """
+    Devolve (GrafoBinario, chave). O GraphML (baixado do OSM, ou o arquivo
+    graphml_path) só é lido quando a versão binária ainda não está no cache.
+    """
+    if graphml_path is not None:
+        graph_key = "arquivo-" + file_key(graphml_path)
+        ler_graphml = lambda: ox.load_graphml(graphml_path)
+    else:
+        params = {"coords": coords, "custom_filter": custom_filter, "network_type": network_type}
+        graph_key = artifact_key("grafo", params)
+
+        def baixar():
+            print("Baixando grafo do OSM...")
+            return ox.graph_from_polygon(Polygon(coords), custom_filter=custom_filter,
+                                         network_type=network_type)
+
+        ler_graphml = lambda: cached("grafo", params, (), baixar, ext=".graphml",
+                                     save=ox.save_graphml, load=ox.load_graphml)[0]
+
+    return cached("grafo_bin", {"version": FORMAT_VERSION}, [graph_key],
+                  lambda: converter(ler_graphml()), ext="",
+                  save=lambda grafo, path: grafo.salvar(path), load=GrafoBinario.abrir,
+                  label="grafo binário")
+
+def carregar_contraido(grafo, graph_key):
+    """(GrafoContraido, chave) de um grafo já carregado, pela etapa de cache "grafo_contraido"."""
+    return cached("grafo_contraido", {"version": FORMAT_VERSION}, [graph_key],
+                  lambda: contrair(grafo), ext="",
+                  save=lambda contraido, path: contraido.salvar(path), load=GrafoContraido.abrir,
+                  label="grafo contraído")
@@ -1,14 +1,15 @@
-import networkx as nx
-import osmnx as ox
+import numpy as np
+import igraph as ig
 import plotly.graph_objects as go
 from shapely.geometry import Polygon
 import os
-import pickle
-import community as community_louvain  
+from cache import CACHE_DIR, cached
+from grafo import carregar_contraido, carregar_grafo
+from paralelo import carga_grafo, mapa_paralelo
+from renderizacao import arestas_unicas, camada_arestas, figura_mapa, posicoes, salvar_html
 import random
 
 
-CACHE_DIR = "dados_cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 #Polígono de Palmas
@@ -37,111 +38,165 @@ custom_filter = (
 )
 
 
-def save_pickle(obj, filename):
-    with open(filename, "wb") as f:
-        pickle.dump(obj, f)
-
-def load_pickle(filename):
-    with open(filename, "rb") as f:
-        return pickle.load(f)
-
-#Carregar / gerar grafo 
+#Carregar / gerar grafo
 def iniciarGrafo():
-    graph_path = os.path.join(CACHE_DIR, "grafo.graphml")
-
-    if os.path.exists(graph_path):
-        print("Carregando grafo do cache...")
-        G = ox.load_graphml(graph_path)
-    else:
-        print("Gerando grafo a partir do polígono...")
-        G = ox.graph_from_polygon(poly, custom_filter=custom_filter, network_type='drive')
-        ox.save_graphml(G, graph_path)
-        print("Grafo salvo em cache.")
-
-    return G  
-
-G = iniciarGrafo()
-
-
-louvain_cache = os.path.join(CACHE_DIR, "louvain_partition.pkl")
-
-if os.path.exists(louvain_cache):
-    print("Carregando clusters Louvain do cache...")
-    partition = load_pickle(louvain_cache)
-else:
-    print("Aplicando o algoritmo de Louvain...")
-    G_undirected = G.to_undirected()
-    partition = community_louvain.best_partition(G_undirected)
-    save_pickle(partition, louvain_cache)
-    print("Resultado Louvain salvo.")
-
-
-print("Projetando grafo para UTM e rotacionando 90°...")
-G_proj = ox.project_graph(G)
-G_proj = nx.Graph(G_proj) 
-
-pos = {}
-for n in G_proj.nodes():
-    x = G_proj.nodes[n]["x"]
-    y = G_proj.nodes[n]["y"]
-    pos[n] = (y, -x)  
-
-#Gerar cores aleatórias para cada cluster 
-clusters = list(set(partition.values()))
-cluster_to_color = {}
-random.seed(124) 
+    return carregar_grafo(coords, custom_filter)
 
-def random_color():
-    return f'rgb({random.randint(0,255)},{random.randint(0,255)},{random.randint(0,255)})'
 
-for c in clusters:
-    cluster_to_color[c] = random_color()
+#Comunidades: varredura de resoluções e sementes
+_worker_graph = None
 
+def _init_worker(n, edges):
+    global _worker_graph
+    _worker_graph = ig.Graph(n=n, edges=edges)
 
-node_x, node_y, node_color = [], [], []
-for node in G_proj.nodes():
-    x, y = pos[node]
-    node_x.append(x)
-    node_y.append(y)
-    node_color.append(cluster_to_color.get(partition.get(node, -1), 'rgb(128,128,128)')) 
-
-
-node_trace = go.Scatter(
-    x=node_x, y=node_y,
-    mode='markers',
-    marker=dict(
-        size=4,
-        color=node_color,
-        line=dict(width=1)
-    ),
-    hoverinfo='text'
-)
-
-
-edge_x, edge_y = [], []
-for u, v in G_proj.edges():
-    x0, y0 = pos[u]
-    x1, y1 = pos[v]
-    edge_x += [x0, x1, None]
-    edge_y += [y0, y1, None]
-
-edge_trace = go.Scatter(
-    x=edge_x, y=edge_y,
-    line=dict(width=2, color='DarkSlateGrey'),
-    hoverinfo='none',
-    mode='lines'
-)
-
-
-fig = go.Figure(data=[edge_trace, node_trace])
-fig.update_layout(
-    title='Grafo com clusters Louvain',
-    showlegend=False,
-    hovermode='closest',
-    margin=dict(b=20, l=5, r=5, t=40),
-    xaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False),
-    yaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False)
-)
-fig.update_yaxes(scaleanchor="x", scaleratio=1) 
-
-fig.show()
+def _detectar(task):
+    method, resolution, seed = task
+    # o igraph sorteia com o módulo random do Python: mesma semente, mesma partição
+    random.seed(seed)
+    if method == "leiden":
+        clustering = _worker_graph.community_leiden(objective_function="modularity",
+                                                    resolution=resolution, n_iterations=-1)
+    else:
+        clustering = _worker_graph.community_multilevel(resolution=resolution)
+    membership = np.array(clustering.membership, dtype=np.int32)
+    # modularidade usual (resolução 1), comparável entre resoluções
+    return membership, _worker_graph.modularity(membership.tolist())
+
+
+def consenso(G, partitions, threshold=0.5, seed=0):
+    """
+    Partição de consenso e estabilidade por nó de um conjunto de partições
+    (uma por linha).
+
+    Cada aresta recebe a fração de execuções em que as pontas ficaram juntas;
+    o consenso é um Louvain no grafo dessas frações (arestas abaixo de
+    threshold saem). A estabilidade de um nó é a fração de execuções em que a
+    sua comunidade corresponde (maior sobreposição) à sua comunidade no consenso.
+    """
+    edges = np.array(G.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    agreement = (partitions[:, edges[:, 0]] == partitions[:, edges[:, 1]]).mean(axis=0)
+
+    keep = agreement >= threshold
+    H = ig.Graph(n=G.vcount(), edges=edges[keep].tolist())
+    random.seed(seed)
+    consensus = np.array(H.community_multilevel(weights=agreement[keep].tolist()).membership,
+                         dtype=np.int32)
+
+    n = G.vcount()
+    stability = np.zeros(n)
+    for run in partitions:
+        # cada comunidade da execução corresponde à comunidade do consenso com que mais se sobrepõe
+        pairs, counts = np.unique(np.column_stack((run, consensus)), axis=0, return_counts=True)
+        order = np.lexsort((-counts, pairs[:, 0]))
+        first = np.unique(pairs[order, 0], return_index=True)[1]
+        match = np.full(run.max() + 1, -1)
+        match[pairs[order[first], 0]] = pairs[order[first], 1]
+        stability += match[run] == consensus
+    return consensus, stability / len(partitions)
+
+
+def varrer_comunidades(G, resolutions, n_seeds=20, method="leiden", seed=0, n_workers=1):
+    """
+    Detecta comunidades para cada resolução com n_seeds sementes, em paralelo
+    (n_workers=None usa todos os núcleos). Devolve, por resolução, as
+    partições (execução x nó), a modularidade de cada execução, o consenso e
+    a estabilidade de cada nó.
+    """
+    tasks = [(method, r, f"{seed}:{r}:{i}") for r in resolutions for i in range(n_seeds)]
+    outputs = list(mapa_paralelo(_detectar, tasks, _init_worker, carga_grafo(G), n_workers,
+                                 desc="Comunidades", unit="execuções"))
+
+    resultado = {}
+    for j, r in enumerate(resolutions):
+        runs = outputs[j * n_seeds:(j + 1) * n_seeds]
+        partitions = np.stack([membership for membership, _ in runs])
+        consensus, stability = consenso(G, partitions, seed=seed)
+        resultado[r] = {
+            "partitions": partitions,
+            "modularity": np.array([q for _, q in runs]),
+            "consensus": consensus,
+            "stability": stability,
+        }
+    return resultado
+
+
+if __name__ == "__main__":
+    grafo, graph_key = iniciarGrafo()
+
+    RESOLUCOES = [0.25, 0.5, 1.0, 2.0, 4.0]
+    N_SEEDS = 20
+    METODO = "leiden"  # ou "louvain" (multilevel do igraph)
+    SEED = 124
+
+    CONTRAIR = True  # malha contraída e projeção de volta: ver grafo.contrair
+    analise, analise_key = carregar_contraido(grafo, graph_key) if CONTRAIR else (grafo, graph_key)
+    G = ig.Graph(n=analise.n, edges=np.column_stack(arestas_unicas(analise.src, analise.dst)).tolist())
+
+    def aplicar_louvain():
+        print(f"Aplicando {METODO} em {len(RESOLUCOES)} resoluções x {N_SEEDS} sementes...")
+        return varrer_comunidades(G, RESOLUCOES, N_SEEDS, METODO, SEED, n_workers=None)
+
+    comunidades, _ = cached("louvain_partitions",
+                            {"method": METODO, "resolutions": RESOLUCOES, "seeds": N_SEEDS, "seed": SEED},
+                            [analise_key], aplicar_louvain, label="clusters Louvain")
+    if CONTRAIR:
+        for c in comunidades.values():
+            c["consensus"] = analise.projetar_vertices(c["consensus"])
+            c["stability"] = analise.projetar_vertices(c["stability"])
+
+    for r, c in comunidades.items():
+        print(f"resolução {r}: {c['consensus'].max() + 1} comunidades, "
+              f"modularidade média {c['modularity'].mean():.4f}, estabilidade média {c['stability'].mean():.3f}")
+
+
+    print("Usando coordenadas projetadas (UTM) e rotacionando 90°...")
+    px, py = posicoes(grafo, projected=True)
+    src, dst = arestas_unicas(grafo.src, grafo.dst)
+
+    #Gerar cores aleatórias para cada cluster 
+    random.seed(124) 
+
+    def random_color():
+        return f'rgb({random.randint(0,255)},{random.randint(0,255)},{random.randint(0,255)})'
+
+    # cor por índice do cluster: o HTML guarda um inteiro por nó, não uma string
+    n_cores = max(int(c["consensus"].max()) + 1 for c in comunidades.values())
+    colors = [random_color() for _ in range(n_cores)]
+    colorscale = [[i / max(n_cores - 1, 1), c] for i, c in enumerate(colors)]
+
+
+    fig = figura_mapa('Grafo com clusters Louvain')
+
+    camada_arestas(fig, px, py, src, dst, niveis=3, line=dict(width=2, color='DarkSlateGrey'))
+
+    inicial = 1.0 if 1.0 in comunidades else RESOLUCOES[0]
+    fig.add_trace(go.Scattergl(
+        x=px.astype(np.float32), y=py.astype(np.float32),
+        mode='markers',
+        marker=dict(
+            size=4,
+            color=comunidades[inicial]["consensus"],
+            colorscale=colorscale,
+            cmin=0,
+            cmax=n_cores - 1,
+            line=dict(width=1)
+        ),
+        text=[f"estabilidade {s:.2f}" for s in comunidades[inicial]["stability"]],
+        hoverinfo='text'
+    ))
+
+    # um botão por resolução troca as cores (consenso) e a estabilidade exibida dos nós
+    nos = len(fig.data) - 1
+    fig.update_layout(updatemenus=[dict(
+        type="dropdown", x=0, y=1, xanchor="left", yanchor="top",
+        active=RESOLUCOES.index(inicial),
+        buttons=[dict(
+            label=f"resolução {r} ({c['consensus'].max() + 1} comunidades)",
+            method="restyle",
+            args=[{"marker.color": [c["consensus"]],
+                   "text": [[f"estabilidade {s:.2f}" for s in c["stability"]]]}, [nos]],
+        ) for r, c in comunidades.items()],
+    )])
+
+    salvar_html(fig, "mapa_louvain.html")
@@ -0,0 +1,38 @@
+"""
+Execução paralela compartilhada pelos scripts.
+
+O grafo vai uma vez para cada processo, como lista de arestas, pelo
+inicializador do pool, e não a cada tarefa; as tarefas são distribuídas em
+blocos. Em série (n_workers <= 1) o mesmo inicializador roda no próprio
+processo, então o resultado não depende do modo.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+
+def carga_grafo(G):
+    """Argumentos do inicializador para montar G no processo: (n, arestas)."""
+    return G.vcount(), G.get_edgelist()
+
+
+def mapa_paralelo(funcao, tarefas, inicializar, initargs=(), n_workers=1, desc=None, unit="tarefas"):
+    """
+    Aplica funcao a cada tarefa em série (n_workers <= 1) ou num pool de
+    processos (n_workers=None usa todos os núcleos) preparado por
+    inicializar(*initargs). Os resultados saem um a um, na ordem das
+    tarefas; com desc, o progresso aparece numa barra do tqdm.
+    """
+    tarefas = list(tarefas)
+    if n_workers is not None and n_workers <= 1:
+        inicializar(*initargs)
+        resultados = map(funcao, tarefas)
+        yield from tqdm(resultados, total=len(tarefas), desc=desc, unit=unit, disable=desc is None)
+        return
+
+    n_workers = n_workers or os.cpu_count()
+    chunksize = max(1, len(tarefas) // (n_workers * 4))
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=inicializar, initargs=initargs) as executor:
+        yield from tqdm(executor.map(funcao, tarefas, chunksize=chunksize),
+                        total=len(tarefas), desc=desc, unit=unit, disable=desc is None)
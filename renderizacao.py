@@ -0,0 +1,138 @@
+"""
+Renderização compartilhada dos mapas da malha viária (Plotly WebGL).
+
+As coordenadas das arestas são montadas de uma vez com NumPy (um NaN separa
+cada segmento) e desenhadas com Scattergl. A camada de fundo pode ter vários
+níveis de detalhe: cada nível junta os vértices numa grade de células e
+mantém uma aresta por par de células vizinhas; um script embutido no HTML
+mostra o nível adequado ao zoom atual. O HTML sai autocontido, com os
+arrays em float32 codificados em binário.
+"""
+import json
+import webbrowser
+
+import numpy as np
+import plotly.graph_objects as go
+
+# largura aproximada da tela em pixels e lado máximo, em pixels, das células do nível exibido
+LARGURA_TELA = 1600
+PIXELS_POR_CELULA = 3
+
+
+def posicoes(grafo, projected=True):
+    """Coordenadas de plot dos vértices, rotacionadas 90° como nos mapas originais: (y, -x)."""
+    x, y = (grafo.x_proj, grafo.y_proj) if projected else (grafo.x, grafo.y)
+    px = np.asarray(y, dtype=np.float64)
+    py = -np.asarray(x, dtype=np.float64)
+    # origem no canto do mapa: float32 mantém a precisão em coordenadas UTM
+    return px - px.min(), py - py.min()
+
+
+def arestas_unicas(src, dst):
+    """Pares não direcionados distintos (mão e contramão viram um único traço)."""
+    pares = np.unique(np.column_stack((np.minimum(src, dst), np.maximum(src, dst))), axis=0)
+    pares = pares[pares[:, 0] != pares[:, 1]]
+    return pares[:, 0], pares[:, 1]
+
+
+def tracado(px, py, src, dst):
+    """Arrays x, y de uma camada de segmentos: [x_u, x_v, NaN, ...]."""
+    m = len(src)
+    xs = np.full(3 * m, np.nan, dtype=np.float32)
+    ys = np.full(3 * m, np.nan, dtype=np.float32)
+    xs[0::3], xs[1::3] = px[src], px[dst]
+    ys[0::3], ys[1::3] = py[src], py[dst]
+    return xs, ys
+
+
+def simplificar(px, py, src, dst, celula):
+    """
+    Uma aresta por par de células da grade de lado `celula` ligadas por
+    alguma aresta; cada célula é desenhada no seu primeiro vértice.
+    """
+    cx = np.floor(px / celula).astype(np.int64)
+    cy = np.floor(py / celula).astype(np.int64)
+    _, rep, cell = np.unique(cx * (cy.max() + 1) + cy, return_index=True, return_inverse=True)
+    a, b = cell.ravel()[src], cell.ravel()[dst]
+    a, b = arestas_unicas(a, b)
+    return rep[a], rep[b]
+
+
+def camada_arestas(fig, px, py, src, dst, niveis=0, **kwargs):
+    """
+    Adiciona uma camada de arestas. Com niveis > 0 a camada ganha até
+    `niveis` versões simplificadas (células 4x maiores a cada nível), trocadas
+    conforme o zoom; um nível só entra se reduzir a camada pelo menos à metade.
+    """
+    src, dst = np.asarray(src), np.asarray(dst)
+    kwargs.setdefault("hoverinfo", "none")
+
+    camadas = [(0.0, src, dst)]
+    if niveis > 0 and len(src):
+        extensao = max(px.max() - px.min(), py.max() - py.min(), 1.0)
+        for i in range(niveis - 1, -1, -1):
+            celula = extensao * PIXELS_POR_CELULA / LARGURA_TELA / 4 ** i
+            s, d = simplificar(px, py, src, dst, celula)
+            if len(s) <= len(camadas[-1][1]) / 2:
+                camadas.append((celula, s, d))
+
+    if len(camadas) == 1:
+        xs, ys = tracado(px, py, src, dst)
+        fig.add_trace(go.Scattergl(x=xs, y=ys, mode="lines", **kwargs))
+        return
+
+    # o nível de célula c vale enquanto a célula ocupa até PIXELS_POR_CELULA pixels na tela
+    limites = [float(c * LARGURA_TELA / PIXELS_POR_CELULA) for c, _, _ in camadas] + [None]
+    for i, (_, s, d) in enumerate(camadas):
+        xs, ys = tracado(px, py, s, d)
+        # começa no nível mais simples (mapa inteiro visível)
+        fig.add_trace(go.Scattergl(
+            x=xs, y=ys, mode="lines", visible=(i == len(camadas) - 1),
+            meta={"lod": [limites[i], limites[i + 1]]}, **kwargs))
+
+
+def figura_mapa(titulo, showlegend=False):
+    fig = go.Figure()
+    fig.update_layout(
+        title=titulo,
+        showlegend=showlegend,
+        hovermode="closest",
+        margin=dict(b=20, l=5, r=5, t=40),
+        xaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showline=False, showgrid=False, zeroline=False, showticklabels=False)
+    )
+    fig.update_yaxes(scaleanchor="x", scaleratio=1)
+    return fig
+
+
+# troca o nível de detalhe das camadas de arestas conforme a largura visível do eixo x
+_LOD_SCRIPT = """
+var gd = document.getElementById('{plot_id}');
+var lod = %s;
+var atual = null;
+function nivelDetalhe() {
+    var r = gd._fullLayout.xaxis.range;
+    var largura = Math.abs(r[1] - r[0]);
+    var vis = lod.map(function (t) {
+        return largura >= t.lim[0] && (t.lim[1] === null || largura < t.lim[1]);
+    });
+    var chave = vis.join();
+    if (chave === atual) return;
+    atual = chave;
+    Plotly.restyle(gd, {visible: vis}, lod.map(function (t) { return t.i; }));
+}
+gd.on('plotly_relayout', nivelDetalhe);
+nivelDetalhe();
+"""
+
+
+def salvar_html(fig, path, abrir=True, include_plotlyjs=True):
+    """Grava o mapa num HTML autocontido (e abre no navegador, como fig.show)."""
+    lod = [{"i": i, "lim": trace.meta["lod"]} for i, trace in enumerate(fig.data)
+           if isinstance(trace.meta, dict) and "lod" in trace.meta]
+    post_script = _LOD_SCRIPT % json.dumps(lod) if lod else None
+    fig.write_html(path, include_plotlyjs=include_plotlyjs, post_script=post_script,
+                   config={"scrollZoom": True})
+    print(f"Mapa salvo em {path}")
+    if abrir:
+        webbrowser.open(path)